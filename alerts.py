@@ -0,0 +1,92 @@
+import threading
+
+OK = 'OK'
+WARNING = 'WARNING'
+CRITICAL = 'CRITICAL'
+RECOVERED = 'RECOVERED'
+
+_SEVERITY = {OK: 0, RECOVERED: 0, WARNING: 1, CRITICAL: 2}
+
+class VolumeAlert:
+    def __init__(self):
+        self.state = OK
+        self.since = None
+        self.last_notified_at = None
+        # severity of the last problem notification, so a recovery is only announced after one
+        self.notified_severity = 0
+
+class AlertTracker:
+    """Alert state of every volume: OK -> WARNING -> CRITICAL -> RECOVERED -> OK.
+
+    A volume enters a state at its threshold but only leaves it once usage drops
+    `hysteresis` points below, so a volume hovering around a threshold does not
+    flap. evaluate() tells the caller when a notification is due: on escalation,
+    on recovery of an announced problem, and every `renotify_seconds` while the
+    problem lasts. Reaching WARNING within `cooldown_seconds` of the last
+    notification is held back and announced on the first evaluation after the
+    cooldown if the volume is still in WARNING; reaching CRITICAL is always
+    announced.
+    """
+
+    def __init__(self):
+        self._volumes = {}
+        self._lock = threading.Lock()
+
+    def state(self, disk_path):
+        volume = self._volumes.get(disk_path)
+        return volume.state if volume else OK
+
+    def _level(self, current, percent, usage_threshold, critical_threshold, hysteresis):
+        # an empty or 0 critical_threshold means volumes never go CRITICAL
+        if critical_threshold and percent >= critical_threshold:
+            return CRITICAL
+        if critical_threshold and current == CRITICAL and percent >= critical_threshold - hysteresis:
+            return CRITICAL
+        if percent >= usage_threshold:
+            return WARNING
+        if current in (WARNING, CRITICAL) and percent >= usage_threshold - hysteresis:
+            return WARNING
+        return OK
+
+    def evaluate(self, disk_path, percent, now, usage_threshold, critical_threshold,
+                 hysteresis=0, cooldown_seconds=0, renotify_seconds=0):
+        """Moves the volume to its new state and returns (state, event).
+
+        event is None, or one of 'warning', 'critical', 'reminder' and 'recovered'
+        when a notification should go out.
+        """
+        with self._lock:
+            volume = self._volumes.get(disk_path)
+            if volume is None:
+                volume = self._volumes[disk_path] = VolumeAlert()
+
+            previous = volume.state
+            level = self._level(previous, percent, usage_threshold, critical_threshold, hysteresis)
+            if level == OK:
+                state = RECOVERED if _SEVERITY[previous] else OK
+            else:
+                state = level
+            if state != previous:
+                volume.state = state
+                volume.since = now
+
+            event = None
+            since_notified = now - volume.last_notified_at if volume.last_notified_at is not None else None
+            # a state above the last announced one is due, including a warning held back by the cooldown
+            if _SEVERITY[state] > _SEVERITY[previous] or _SEVERITY[state] > volume.notified_severity:
+                in_cooldown = since_notified is not None and since_notified < cooldown_seconds
+                if state == CRITICAL or not in_cooldown:
+                    event = state.lower()
+            elif state == RECOVERED:
+                if volume.notified_severity:
+                    event = 'recovered'
+            elif _SEVERITY[state] and renotify_seconds and since_notified is not None and since_notified >= renotify_seconds:
+                event = 'reminder'
+
+            if event == 'recovered':
+                volume.last_notified_at = now
+                volume.notified_severity = 0
+            elif event:
+                volume.last_notified_at = now
+                volume.notified_severity = _SEVERITY[state]
+            return state, event
@@ -1,30 +1,80 @@
 import os
+import ssl
+import signal
+import threading
 import subprocess
 import sys
 import shutil
 import socket
 import json
+import time
 import traceback
-from flask import Flask, jsonify, request, render_template, send_file, send_from_directory
+from datetime import datetime
+from urllib.parse import urlsplit
+from flask import Flask, Response, jsonify, request, render_template, send_file, send_from_directory, redirect
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.executors.pool import ThreadPoolExecutor as JobExecutor
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
 from config_manager import ConfigManager
 from logger import Logger
-from disk_scanner import disk_stats
+from disk_history import DiskHistory, PersistentDiskHistory
+from forecast import DiskForecast
+from sampling import AdaptiveInterval
+from job_health import SchedulerHealth
+from snapshot import SerializedSnapshot, snapshot_response
+from sse_hub import SseHub, STREAM_PATH
+from usage_scanner import get_usage_scanner
+from retention import get_retention_planner
+from fleet import get_fleet_poller, close_fleet_poller
+import metrics
+from disk_scanner import multi_disk_stats, get_disk_paths
 from generate_ssl_keys import generate_ssl_keys
 from generate_vapid_keys import generate_vapid_keys
-from notifications import send_notification, check_disk_warning, save_subscription, unsubscribe
+from notifications import check_fleet_alerts, enqueue_notification, get_outbox, close_outbox, get_vapid_signer, check_disk_warning, check_disk_forecast, save_subscription, unsubscribe, subscription_store, count_subscriptions
 from service_manager import install_service_from_config
+from web_server import serve
 
 app = Flask(__name__)
 
 config_manager = ConfigManager()
 
 log_file_path = config_manager.get('DISK_MONITOR', 'log_file')
-disk_path = config_manager.get('DISK_MONITOR', 'disk_path')
-usage_threshold = config_manager.get('DISK_MONITOR', 'usage_threshold', int)
-logger = Logger(log_file_path)
-enable_notifications = config_manager.get('NOTIFICATIONS', 'enable_notifications', bool)
+logger = Logger(
+    log_file_path,
+    echo=config_manager.get('DISK_MONITOR', 'log_to_console', bool),
+    max_bytes=config_manager.get('DISK_MONITOR', 'log_max_bytes', int),
+    max_age_hours=config_manager.get('DISK_MONITOR', 'log_max_age_hours', float),
+    backup_count=config_manager.get('DISK_MONITOR', 'log_backup_count', int)
+)
 latest_disk_stats = {}
+latest_disk_stats_snapshot = SerializedSnapshot(latest_disk_stats)
+latest_fleet_snapshot = None
+sse_port = config_manager.get('WEB_SERVER', 'sse_port', int)
+sse_hub = SseHub('0.0.0.0', sse_port, max_clients=config_manager.get('WEB_SERVER', 'sse_max_clients', int)) if sse_port else None
+if config_manager.get('DISK_MONITOR', 'persist_history', bool):
+    disk_history = PersistentDiskHistory(
+        config_manager.get('DISK_MONITOR', 'history_capacity', int),
+        config_manager.get('DISK_MONITOR', 'history_path')
+    )
+else:
+    disk_history = DiskHistory(config_manager.get('DISK_MONITOR', 'history_capacity', int))
+disk_forecast = DiskForecast(config_manager.get('DISK_MONITOR', 'forecast_window_minutes', float) * 60, disk_history)
+adaptive_interval = AdaptiveInterval()
+# seconds between fetch_disk_stats runs as currently scheduled, None until the first sample set it
+sampling_interval = None
+# unix time of the last completed sample, for /health
+latest_sampled_at = None
+# scheduled run time of the latest submission of every job, for the lag of its run
+scheduled_run_times = {}
+scheduler_health = SchedulerHealth()
+metrics.registry.gauge('disk_monitor_subscriptions', "Number of push subscriptions.",
+                       function=lambda: count_subscriptions(config_manager))
+metrics.registry.gauge('disk_monitor_outbox_pending', "Notification deliveries waiting to be made or retried.",
+                       function=lambda: get_outbox(config_manager, logger).pending)
+metrics.registry.gauge('disk_monitor_log_queue_depth', "Log lines waiting for the writer thread.",
+                       function=lambda: logger.queue_depth)
+metrics.registry.counter('disk_monitor_log_dropped_lines_total', "Log lines dropped because the log queue was full.",
+                         function=lambda: logger.dropped)
 
 def log_config_on_startup():
     config_message = "Application configuration loaded:\n"
@@ -35,32 +85,328 @@ def log_config_on_startup():
     logger.log(config_message, level="INFO")
 
 def fetch_disk_stats():
-    global latest_disk_stats
-    stats = disk_stats(config_manager, logger)
+    global latest_disk_stats, latest_disk_stats_snapshot, latest_sampled_at
+    sampled_at = time.time()
+    started = time.perf_counter()
+    stats = multi_disk_stats(config_manager, logger)
+    metrics.disk_stats_duration.observe(time.perf_counter() - started)
     if stats:
         latest_disk_stats = stats
-        check_disk_warning(config_manager, logger, latest_disk_stats)
+        disk_history.record_stats(stats, sampled_at)
+        disk_forecast.update_stats(stats, sampled_at)
+        for volume_stats in stats.values():
+            check_disk_warning(config_manager, logger, volume_stats)
+            check_disk_forecast(config_manager, logger, volume_stats)
+        latest_disk_stats_snapshot = SerializedSnapshot(latest_disk_stats)
+        metrics.update_volume_metrics(stats)
+        latest_sampled_at = time.time()
+        metrics.disk_stats_last_run.set(latest_sampled_at)
+        if sse_hub:
+            sse_hub.publish(latest_disk_stats_snapshot.body, latest_disk_stats_snapshot.etag)
+        adapt_sampling_interval(stats, sampled_at)
+
+def adapt_sampling_interval(stats, sampled_at):
+    """Re-arms fetch_disk_stats sooner as volumes near a threshold or fill faster, and later while they are idle."""
+    global sampling_interval
+    base = config_manager.get('DISK_MONITOR', 'check_interval_minutes', float) * 60
+    pacing = None
+    if config_manager.get('DISK_MONITOR', 'adaptive_interval', bool):
+        seconds, pacing = adaptive_interval.next_interval(
+            stats, sampled_at, base,
+            config_manager.get('DISK_MONITOR', 'min_check_interval_seconds', float) or base,
+            (config_manager.get('DISK_MONITOR', 'max_check_interval_minutes', float) or 0) * 60 or base,
+            config_manager.get('DISK_MONITOR', 'critical_threshold', float)
+        )
+    else:
+        seconds = base
+    metrics.sampling_interval.set(seconds)
+    # small changes are not worth moving the schedule for
+    if sampling_interval is not None and abs(seconds - sampling_interval) <= sampling_interval * 0.1:
+        return
+    if scheduler.get_job('fetch_disk_stats'):
+        scheduler.reschedule_job('fetch_disk_stats', trigger='interval', seconds=seconds)
+    if sampling_interval is not None:
+        logger.log(f"Sampling every {seconds:g} s (was {sampling_interval:g} s)"
+                   + (f", paced by '{pacing}'." if pacing else "."), level="INFO")
+    sampling_interval = seconds
+
+def poll_fleet():
+    global latest_fleet_snapshot
+    fleet_poller = get_fleet_poller(config_manager)
+    if fleet_poller is None:
+        latest_fleet_snapshot = None
+        return
+    metrics.fleet_poll_duration.observe(fleet_poller.poll())
+    view = fleet_poller.view()
+    metrics.fleet_nodes.replace({(status,): view['summary'][status] for status in ('ok', 'stale', 'down')})
+    check_fleet_alerts(config_manager, logger, view)
+    latest_fleet_snapshot = SerializedSnapshot(view)
+
+def monitored_job(job_id, func):
+    """Wraps a scheduled job to record its lag, duration and outcome; errors are logged, not raised."""
+    def run():
+        scheduled_at = scheduled_run_times.pop(job_id, None)
+        started_at = time.time()
+        if scheduled_at is not None:
+            metrics.scheduler_lag.set(max(0.0, started_at - scheduled_at), job_id)
+        started = time.perf_counter()
+        failed = False
+        try:
+            func()
+        except Exception as e:
+            failed = True
+            logger.log(f"Job {job_id} failed: {e}\n{traceback.format_exc()}", level="ERROR")
+        finally:
+            duration = time.perf_counter() - started
+            scheduler_health.record(job_id, scheduled_at, started_at, duration, failed)
+            metrics.job_duration.observe(duration, job_id)
+            metrics.job_runs.inc(job_id, 'error' if failed else 'ok')
+    return run
+
+def record_scheduled_run(event):
+    scheduled_run_times[event.job_id] = event.scheduled_run_times[-1].timestamp()
 
-scheduler = BackgroundScheduler()
+def record_missed_run(event):
+    if event.code == EVENT_JOB_MISSED:
+        scheduler_health.count_missed(event.job_id)
+        metrics.job_runs.inc(event.job_id, 'missed')
+    else:
+        # the previous run was still going
+        scheduler_health.count_skipped(event.job_id)
+        metrics.job_runs.inc(event.job_id, 'skipped')
+    run_time = event.scheduled_run_time if event.code == EVENT_JOB_MISSED else event.scheduled_run_times[-1]
+    logger.log(f"Job {event.job_id} run due at {run_time:%H:%M:%S} was "
+               f"{'missed' if event.code == EVENT_JOB_MISSED else 'skipped, the previous run is still going'}.",
+               level="WARNING")
+
+# sampling and fleet polling get executors of their own, so a stalled mount or a slow fleet round cannot hold up
+# the other jobs; statvfs calls, log writes and web-push deliveries already run on their own threads
+scheduler = BackgroundScheduler(
+    executors={
+        'default': JobExecutor(4),
+        'sampling': JobExecutor(1),
+        'fleet': JobExecutor(1),
+    },
+    # runs never overlap, a backlog of runs collapses into one, and a run later than the grace time is dropped
+    job_defaults={'max_instances': 1, 'coalesce': True, 'misfire_grace_time': 60}
+)
+scheduler.add_listener(record_scheduled_run, EVENT_JOB_SUBMITTED)
+scheduler.add_listener(record_missed_run, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
 scheduler.add_job(
-    func=fetch_disk_stats,
+    func=monitored_job('fetch_disk_stats', fetch_disk_stats),
+    id='fetch_disk_stats',
+    executor='sampling',
     trigger='interval',
     seconds=config_manager.get('DISK_MONITOR', 'check_interval_minutes', float) * 60,
     args=[]
 )
+
+def scan_directory_usage():
+    usage_scanner = get_usage_scanner(config_manager)
+    for disk_path in get_disk_paths(config_manager):
+        usage_scanner.request_scan(disk_path, logger)
+
+def schedule_usage_scan():
+    usage_scan_interval = config_manager.get('DISK_MONITOR', 'usage_scan_interval_minutes', float)
+    if not usage_scan_interval and config_manager.get('DISK_MONITOR', 'use_usage_index', bool):
+        # an index refresh is cheap enough to follow the sampling interval
+        usage_scan_interval = config_manager.get('DISK_MONITOR', 'check_interval_minutes', float)
+    if usage_scan_interval:
+        scheduler.add_job(func=monitored_job('scan_directory_usage', scan_directory_usage), id='scan_directory_usage', trigger='interval',
+                          seconds=usage_scan_interval * 60, replace_existing=True)
+    elif scheduler.get_job('scan_directory_usage'):
+        scheduler.remove_job('scan_directory_usage')
+
+def schedule_fleet_poll():
+    if config_manager.get('FLEET', 'nodes'):
+        scheduler.add_job(func=monitored_job('poll_fleet', poll_fleet), id='poll_fleet', executor='fleet', trigger='interval',
+                          seconds=config_manager.get('FLEET', 'poll_interval_seconds', float) or 60,
+                          next_run_time=datetime.now(), replace_existing=True)
+    elif scheduler.get_job('poll_fleet'):
+        scheduler.remove_job('poll_fleet')
+        poll_fleet()
+
+# settings only read while the app starts up
+RESTART_REQUIRED = {
+    'port', 'ssl_cert_path', 'ssl_key_path', 'sse_port', 'sse_max_clients', 'server_mode', 'server_threads',
+    'server_timeout_seconds', 'log_file', 'log_to_console', 'log_max_bytes', 'log_max_age_hours', 'log_backup_count',
+    'history_capacity', 'persist_history', 'history_path', 'forecast_window_minutes', 'usage_scan_depth', 'usage_top_n',
+    'usage_scan_workers', 'use_usage_index', 'usage_index_file', 'usage_full_rescan_hours', 'retention_unit_depth',
+    'config_reload_seconds', 'outbox_db_file', 'retry_base_seconds', 'retry_max_seconds', 'outbox_max_age_hours',
+    'service_name', 'user', 'group', 'runtime_log_file',
+}
+
+def apply_config_changes(changed):
+    """Re-applies a reloaded configuration; thresholds are read on every sample and need nothing here."""
+    global sampling_interval
+    keys = {key for _, key in changed}
+    logger.log(f"Configuration reloaded (version {config_manager.snapshot.version}), changed: "
+               f"{', '.join(f'{section}.{key}' for section, key in sorted(changed))}", level="INFO")
+    if keys & {'check_interval_minutes', 'adaptive_interval', 'min_check_interval_seconds', 'max_check_interval_minutes'}:
+        # start over from the base interval, the next sample adapts it again
+        sampling_interval = None
+        scheduler.reschedule_job('fetch_disk_stats', trigger='interval',
+                                 seconds=config_manager.get('DISK_MONITOR', 'check_interval_minutes', float) * 60)
+    if keys & {'usage_scan_interval_minutes', 'use_usage_index', 'check_interval_minutes'}:
+        schedule_usage_scan()
+    if any(section == 'FLEET' for section, _ in changed):
+        schedule_fleet_poll()
+    restart = keys & RESTART_REQUIRED
+    if restart:
+        logger.log(f"Restart the service to apply: {', '.join(sorted(restart))}", level="WARNING")
+
+def reload_config():
+    try:
+        config_manager.reload()
+    except Exception as e:
+        logger.log(f"Failed to reload the configuration: {e}", level="ERROR")
+
+def watch_config():
+    try:
+        config_manager.reload_if_changed()
+    except Exception as e:
+        logger.log(f"Failed to reload the configuration: {e}", level="ERROR")
+
+config_manager.add_listener(apply_config_changes)
+schedule_usage_scan()
+schedule_fleet_poll()
+config_reload_seconds = config_manager.get('DISK_MONITOR', 'config_reload_seconds', float)
+if config_reload_seconds:
+    scheduler.add_job(func=monitored_job('watch_config', watch_config), id='watch_config', trigger='interval',
+                      seconds=config_reload_seconds)
 scheduler.start()
 fetch_disk_stats()
 
+def shutdown():
+    """Stops the background jobs and flushes history and log, after the web server has stopped."""
+    logger.log("Shutting down.", level="INFO")
+    if scheduler.running:
+        scheduler.shutdown(wait=True)
+    if sse_hub:
+        sse_hub.close()
+    close_fleet_poller()
+    close_outbox()
+    disk_history.close()
+    logger.close()
+
 @app.route('/')
 def home():
-    return render_template('index.html')
+    return render_template('index.html', sse_port=sse_port or 0, fleet_enabled=latest_fleet_snapshot is not None)
 
 @app.route('/disk_stats', methods=['GET'])
 def get_disk_stats():
-    global latest_disk_stats
-    client_ip = request.remote_addr
-    logger.log(f"disk_stats endpoint was accessed by {client_ip}.", level="INFO")
-    return jsonify(latest_disk_stats)
+    return snapshot_response(latest_disk_stats_snapshot)
+
+@app.route('/fleet', methods=['GET'])
+def get_fleet():
+    if latest_fleet_snapshot is None:
+        return jsonify({'message': 'Fleet view is disabled, list the nodes in [FLEET] nodes.'}), 404
+    return snapshot_response(latest_fleet_snapshot)
+
+@app.route('/health', methods=['GET'])
+def get_health():
+    """503 once the latest sample is older than three sampling intervals, with the recent runs of every job."""
+    now = time.time()
+    interval = sampling_interval or config_manager.get('DISK_MONITOR', 'check_interval_minutes', float) * 60
+    age = now - latest_sampled_at if latest_sampled_at is not None else None
+    jobs = scheduler_health.summary()
+    if age is None or age > 3 * interval:
+        status = 'stale'
+    elif any(job['last_outcome'] == 'error' for job in jobs.values()):
+        status = 'degraded'
+    else:
+        status = 'ok'
+    body = {
+        'status': status,
+        'latest_sample_age_seconds': round(age, 1) if age is not None else None,
+        'sampling_interval_seconds': interval,
+        'scheduler_running': scheduler.running,
+        'jobs': jobs,
+        'outbox_pending': get_outbox(config_manager, logger).pending,
+        'log_queue_depth': logger.queue_depth,
+    }
+    response = jsonify(body)
+    response.status_code = 503 if status == 'stale' else 200
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/disk_stats/stream', methods=['GET'])
+def get_disk_stats_stream():
+    # the stream is served by the SSE hub on its own port, so open screens never hold a web server thread
+    if not sse_hub:
+        return jsonify({'message': 'Live stream is disabled, set sse_port in [WEB_SERVER].'}), 404
+    host = urlsplit(f"//{request.host}").hostname
+    if ':' in host:
+        host = f"[{host}]"
+    return redirect(f"{request.scheme}://{host}:{sse_port}{STREAM_PATH}", code=307)
+
+@app.route('/disk_stats/history', methods=['GET'])
+def get_disk_stats_history():
+    now = time.time()
+    start = request.args.get('from', now - 24 * 3600, type=float)
+    end = request.args.get('to', now, type=float)
+    points = max(1, min(request.args.get('points', 500, type=int), 10000))
+
+    disk_path = request.args.get('path')
+    if disk_path:
+        buckets = disk_history.query(disk_path, start, end, points)
+        if buckets is None:
+            return jsonify({'message': f"No history for '{disk_path}'."}), 404
+        return snapshot_response(SerializedSnapshot({disk_path: buckets}))
+    return snapshot_response(SerializedSnapshot({path: disk_history.query(path, start, end, points) for path in disk_history.paths()}))
+
+
+@app.route('/disk_usage/top', methods=['GET'])
+def get_disk_usage_top():
+    usage_scanner = get_usage_scanner(config_manager)
+    disk_paths = get_disk_paths(config_manager)
+    disk_path = request.args.get('path')
+    if disk_path and disk_path not in disk_paths:
+        return jsonify({'message': f"'{disk_path}' is not a monitored path."}), 404
+    top_n = request.args.get('n', type=int)
+    refresh = request.args.get('refresh', '0') in ('1', 'true', 'yes')
+
+    results = {}
+    scanning = False
+    for path in [disk_path] if disk_path else disk_paths:
+        result = usage_scanner.latest(path)
+        if result is None or refresh:
+            usage_scanner.request_scan(path, logger)
+        if usage_scanner.is_running(path):
+            scanning = True
+        if result is not None and top_n:
+            result = dict(result, top=result['top'][:top_n])
+        results[path] = {'scanning': usage_scanner.is_running(path), 'result': result}
+    return snapshot_response(SerializedSnapshot(results)) if not scanning else (jsonify(results), 202)
+
+
+@app.route('/retention/plan', methods=['GET'])
+def get_retention_plan():
+    disk_paths = get_disk_paths(config_manager)
+    if not disk_paths:
+        return jsonify({'message': "No monitored paths."}), 404
+    disk_path = request.args.get('path') or disk_paths[0]
+    if disk_path not in disk_paths:
+        return jsonify({'message': f"'{disk_path}' is not a monitored path."}), 404
+    default_target = config_manager.get('DISK_MONITOR', 'retention_target_percent', float)
+    if not default_target:
+        default_target = (config_manager.get('DISK_MONITOR', 'usage_threshold', int)
+                          - (config_manager.get('DISK_MONITOR', 'hysteresis_percent', float) or 0))
+    target = request.args.get('target', default_target, type=float)
+    limit = request.args.get('limit', 1000, type=int)
+    refresh = request.args.get('refresh', '0') in ('1', 'true', 'yes')
+
+    planner = get_retention_planner(config_manager)
+    plan = planner.latest(disk_path)
+    if plan is None or refresh or plan['target_percent'] != target:
+        planner.request_plan(disk_path, target, logger)
+        return jsonify({'planning': True, 'plan': plan}), 202
+    plan = dict(plan, items=plan['items'][:limit], item_count=len(plan['items']))
+    return snapshot_response(SerializedSnapshot({'planning': planner.is_running(disk_path), 'plan': plan}))
 
 
 @app.route('/vapid_public_key', methods=['GET'])
@@ -77,28 +423,29 @@ def get_vapid_public_key_route():
 
 @app.route('/subscribed_devices', methods=['GET'])
 def get_subscriptions():
-    subscription_file = config_manager.get('NOTIFICATIONS', 'subscription_file')
-    try:
-        content = ""
-        with open(subscription_file, 'r') as f:
-            content = f.read().strip()
-        response = jsonify({"subscribed_devices": content})
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response.headers['Pragma'] = 'no-cache' 
-        response.headers['Expires'] = '0'
-        return response
-    except FileNotFoundError:
-        return jsonify({"error": f"subscriptions file not found at {subscription_file}"}), 500
-    except Exception as e:
-        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    with subscription_store(config_manager) as store:
+        try:
+            devices, next_cursor = store.page(request.args.get('cursor'), limit)
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor.'}), 400
+        summary = store.summary()
+    response = jsonify({"summary": summary, "devices": devices, "next_cursor": next_cursor})
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    response.headers['Pragma'] = 'no-cache'
+    response.headers['Expires'] = '0'
+    return response
 
 
 
 @app.route('/subscribe', methods=['POST'])
 def subscribe_endpoint():
-    subscription_info = request.json
+    subscription_info = request.get_json(silent=True)
     if subscription_info is None:
         return jsonify({'message': 'Invalid JSON in request body.'}), 400
+    if not isinstance(subscription_info, dict) or not isinstance(subscription_info.get('endpoint'), str) \
+            or not subscription_info['endpoint']:
+        return jsonify({'message': 'Invalid subscription, expected a JSON object with an "endpoint".'}), 400
     success = save_subscription(config_manager,logger,subscription_info)
     if success:
         return jsonify({'message': 'Subscription added successfully.'})
@@ -132,8 +479,8 @@ def post_broadcast():
         payload = request.json
         if not payload: #prevent double serialization
             return jsonify({'message': 'Invalid payload.'}), 400
-        send_notification(config_manager, logger, payload)
-        return jsonify({'message': 'Broadcast sent successfully.'})
+        message_id = enqueue_notification(config_manager, logger, payload)
+        return jsonify({'message': 'Broadcast queued.', 'id': message_id}), 202
     except Exception as e:
         print(f"Failed to broadcast notification: {e}")
         return jsonify({'message': f'Failed to send broadcast: {e}'}), 500
@@ -157,6 +504,8 @@ if __name__ == '__main__':
     ssl_key_path = config_manager.get('WEB_SERVER', 'ssl_key_path')
     
     generate_vapid_keys(config_manager)
+    # parse the VAPID key in the background so the first alert does not pay for it
+    threading.Thread(target=get_vapid_signer, args=(config_manager,), daemon=True).start()
     
     ssl_context = None
     if ssl_cert_path and ssl_key_path:
@@ -166,9 +515,33 @@ if __name__ == '__main__':
     
     install_service_from_config(config_manager, logger, "app")
 
-    if ssl_context:
-        print("Server will run with Flask's development server over SSL. Access via HTTPS.")
-        app.run(debug=True, use_reloader=False, host='0.0.0.0', port=port, ssl_context=ssl_context)
-    else:
-        print("No SSL configuration found or key generation failed. Running with Flask's simple server.")
-        app.run(debug=True, use_reloader=False, host='0.0.0.0', port=port)
+    # SIGHUP reloads config.ini; the handler only hands the work to a thread
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(target=reload_config, daemon=True).start())
+
+    if sse_hub:
+        if ssl_context:
+            sse_hub.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            sse_hub.ssl_context.load_cert_chain(ssl_cert_path, ssl_key_path)
+        sse_hub.start()
+
+    server_mode = config_manager.get('WEB_SERVER', 'server_mode') or 'production'
+    try:
+        if server_mode == 'development':
+            if ssl_context:
+                print("Server will run with Flask's development server over SSL. Access via HTTPS.")
+                app.run(debug=True, use_reloader=False, host='0.0.0.0', port=port, ssl_context=ssl_context)
+            else:
+                print("No SSL configuration found or key generation failed. Running with Flask's simple server.")
+                app.run(debug=True, use_reloader=False, host='0.0.0.0', port=port)
+        else:
+            serve(
+                app, '0.0.0.0', port,
+                ssl_cert_path if ssl_context else None,
+                ssl_key_path if ssl_context else None,
+                threads=config_manager.get('WEB_SERVER', 'server_threads', int),
+                timeout=config_manager.get('WEB_SERVER', 'server_timeout_seconds', float),
+                logger=logger
+            )
+    finally:
+        shutdown()
@@ -0,0 +1,130 @@
+import sys
+import json
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fleet import FleetPoller
+
+NODES = 100
+# stand-in nodes that answer after the poll timeout, and ones that are not listening at all
+SLOW_NODES = 5
+DEAD_NODES = 2
+TIMEOUT_SECONDS = 2
+INTERVAL_SECONDS = 60
+ROUNDS = 3
+# full answers and 304s served by all stand-in nodes
+responses = {200: 0, 304: 0}
+
+def node_payload(index):
+    """/disk_stats of a lab server: its own PACS volume plus an archive share every node mounts."""
+    def volume(disk_path, total, percent):
+        used = int(total * percent / 100)
+        return {'disk_path': disk_path, 'usage_threshold': 50, 'disk_status': 'OK',
+                'alert_state': 'WARNING' if percent >= 50 else 'OK',
+                'disk_usage': {'total': total, 'used': used, 'free': total - used, 'percent': percent}}
+    return {
+        '/': volume('/', 250 * 10**9, 20 + index % 30),
+        '/media/Dicom2': volume('/media/Dicom2', 4 * 10**12, 30 + index % 40),
+        '/mnt/archive': volume('/mnt/archive', 100 * 10**12, 93),
+    }
+
+class StandInNode(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0
+    body = b'{}'
+    etag = '""'
+
+    def do_GET(self):
+        try:
+            self.answer()
+        except (BrokenPipeError, ConnectionResetError):
+            # the poller gave up on a slow node before it answered
+            pass
+
+    def answer(self):
+        if self.path != '/disk_stats':
+            self.send_error(404)
+            return
+        if self.delay:
+            time.sleep(self.delay)
+        if self.headers.get('If-None-Match') == self.etag:
+            responses[304] += 1
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        responses[200] += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_node(index, delay):
+    body = json.dumps(node_payload(index)).encode('utf-8')
+    handler = type('Node', (StandInNode,), {'delay': delay, 'body': body,
+                                            'etag': f'"{hashlib.sha1(body).hexdigest()}"'})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def start_fleet():
+    """Starts the stand-in nodes and returns (servers, [(name, url)]) including the dead ones."""
+    servers = []
+    nodes = []
+    for index in range(NODES):
+        server = start_node(index, TIMEOUT_SECONDS * 3 if index < SLOW_NODES else 0)
+        if index >= NODES - DEAD_NODES:
+            # bind a port, then stop listening on it
+            port = server.server_address[1]
+            server.server_close()
+            nodes.append((f"lab{index:03d}", f"http://127.0.0.1:{port}"))
+            continue
+        servers.append(server)
+        nodes.append((f"lab{index:03d}", f"http://127.0.0.1:{server.server_address[1]}"))
+    return servers, nodes
+
+def poll_sequentially(nodes):
+    # the naive loop: one node after the other, each one can use up the whole timeout
+    import requests
+    started = time.perf_counter()
+    for _, url in nodes:
+        try:
+            requests.get(f"{url}/disk_stats", timeout=TIMEOUT_SECONDS).json()
+        except (requests.RequestException, ValueError):
+            pass
+    return time.perf_counter() - started
+
+def main():
+    _, nodes = start_fleet()
+    if '--nodes-only' in sys.argv:
+        # leave the stand-ins running to point an aggregator at them
+        print("nodes = " + ', '.join(f"{name}={url}" for name, url in nodes))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return
+    print(f"{NODES} stand-in nodes ({SLOW_NODES} answer after {TIMEOUT_SECONDS * 3} s, {DEAD_NODES} not listening), "
+          f"poll timeout {TIMEOUT_SECONDS} s, interval {INTERVAL_SECONDS} s")
+    poller = FleetPoller(nodes, timeout=TIMEOUT_SECONDS, stale_after_seconds=3 * INTERVAL_SECONDS, max_workers=32)
+    try:
+        for round_number in range(1, ROUNDS + 1):
+            before = dict(responses)
+            seconds = poller.poll()
+            summary = poller.view()['summary']
+            print(f"  concurrent round {round_number}: {seconds:6.2f} s | ok {summary['ok']}, stale {summary['stale']}, "
+                  f"down {summary['down']} | {summary['volumes']} volumes | "
+                  f"{responses[200] - before[200]} full answers, {responses[304] - before[304]} not modified")
+        print(f"  sequential round:   {poll_sequentially(nodes):6.2f} s")
+    finally:
+        poller.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from pywebpush import webpush
+from config_manager import ConfigManager
+from logger import Logger
+from generate_vapid_keys import generate_vapid_keys
+from notifications import send_notification, subscription_store
+
+# simulated round trip of a push service, the stub answers after this delay
+STUB_LATENCY_SECONDS = 0.02
+SUBSCRIBER_COUNTS = [10, 100, 1000]
+
+class StubPushHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(STUB_LATENCY_SECONDS)
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def make_subscription(port, index):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    p256dh = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.X962,
+        format=serialization.PublicFormat.UncompressedPoint
+    )
+    return {
+        'endpoint': f'http://127.0.0.1:{port}/push/{index}',
+        'keys': {
+            'p256dh': base64.urlsafe_b64encode(p256dh).rstrip(b'=').decode('utf-8'),
+            'auth': base64.urlsafe_b64encode(os.urandom(16)).rstrip(b'=').decode('utf-8'),
+        }
+    }
+
+def send_sequentially(config_manager, subscriptions, payload):
+    # the delivery loop send_notification used before the worker pool
+    for subscription_info in subscriptions:
+        webpush(
+            subscription_info=subscription_info,
+            data=json.dumps(payload),
+            vapid_private_key=config_manager.get('NOTIFICATIONS', 'vapid_private_key'),
+            vapid_claims={"sub": config_manager.get('NOTIFICATIONS', 'vapid_email')}
+        )
+
+def main():
+    skip_sequential = '--skip-sequential' in sys.argv
+    work_dir = tempfile.mkdtemp(prefix='disk_monitor_bench_')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubPushHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    try:
+        config_manager = ConfigManager(os.path.join(work_dir, 'config.ini'))
+        for key, file_name in (('vapid_public_key', 'vapid_public_key.txt'),
+                               ('vapid_private_key', 'vapid_private_key.pem'),
+                               ('subscription_file', 'subscriptions.json'),
+                               ('subscription_db_file', 'subscriptions.db')):
+            config_manager.set('NOTIFICATIONS', key, os.path.join(work_dir, file_name))
+        notifications = config_manager.settings['NOTIFICATIONS']
+        generate_vapid_keys(config_manager)
+        logger = Logger(os.path.join(work_dir, 'benchmark.log'))
+        payload = {"title": "Benchmark", "body": "Benchmark notification."}
+
+        print(f"Stub push service on port {port}, {STUB_LATENCY_SECONDS * 1000:.0f} ms per request, "
+              f"{notifications['push_max_workers']} workers.")
+        for count in SUBSCRIBER_COUNTS:
+            subscriptions = [make_subscription(port, i) for i in range(count)]
+            with subscription_store(config_manager) as store:
+                store.remove_many([sub['endpoint'] for sub in store.all()])
+                for subscription_info in subscriptions:
+                    store.add(subscription_info)
+
+            line = f"{count:>5} subscribers:"
+            if not skip_sequential:
+                start = time.perf_counter()
+                send_sequentially(config_manager, subscriptions, payload)
+                line += f" sequential {time.perf_counter() - start:7.2f} s"
+
+            start = time.perf_counter()
+            results = send_notification(config_manager, logger, payload)
+            elapsed = time.perf_counter() - start
+            delivered = list(results.values()).count('delivered')
+            line += f" | pooled {elapsed:7.2f} s ({delivered}/{count} delivered)"
+            print(line)
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import socket
+import subprocess
+import threading
+import http.client
+
+# concurrent keep-alive clients and how long each mode is measured
+CONCURRENCY = 32
+DURATION_SECONDS = 10
+MODES = ['development', 'production']
+
+def make_app():
+    """A Flask app serving /disk_stats the way app.py does, without the scheduler and service setup."""
+    from flask import Flask
+    from logger import Logger
+    from config_manager import ConfigManager
+    from disk_scanner import disk_stats
+    from snapshot import SerializedSnapshot, snapshot_response
+
+    config_manager = ConfigManager()
+    logger = Logger(os.devnull, echo=False)
+    stats = {path: disk_stats(config_manager, logger, path) for path in ('/', os.getcwd())}
+    snapshot = SerializedSnapshot(stats)
+
+    app = Flask(__name__)
+
+    @app.route('/disk_stats')
+    def get_disk_stats():
+        return snapshot_response(snapshot)
+    return app
+
+def run_server(mode, port):
+    app = make_app()
+    if mode == 'development':
+        # what app.run(debug=True, use_reloader=False) does
+        from werkzeug.serving import run_simple
+        run_simple('127.0.0.1', port, app, use_debugger=True, use_reloader=False, threaded=True)
+    else:
+        from web_server import serve
+        serve(app, '127.0.0.1', port, threads=16)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+def client(port, deadline, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request('GET', '/disk_stats')
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if response.will_close:
+                connection.close()
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+    connection.close()
+
+def measure(mode):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, __file__, '--serve', mode, str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        latencies = []
+        errors = []
+        deadline = time.perf_counter() + DURATION_SECONDS
+        threads = [threading.Thread(target=client, args=(port, deadline, latencies, errors)) for _ in range(CONCURRENCY)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait(15)
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+    print(f"{mode:>12}: {len(latencies) / DURATION_SECONDS:8.0f} req/s | p50 {p50:7.2f} ms | p99 {p99:7.2f} ms | "
+          f"{len(errors)} errors")
+
+def main():
+    if '--serve' in sys.argv:
+        index = sys.argv.index('--serve')
+        run_server(sys.argv[index + 1], int(sys.argv[index + 2]))
+        return
+    print(f"GET /disk_stats with {CONCURRENCY} keep-alive clients for {DURATION_SECONDS} s per mode.")
+    for mode in MODES:
+        measure(mode)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import os
+import sys
+import ssl
+import time
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import tempfile
+import configparser
+import urllib.request
+
+RUNS = 5
+APP_FILES = ['templates', 'static']
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def prepare(work_dir, port):
+    """Copies the app into work_dir with a config that monitors / and serves on `port`."""
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in os.listdir(source_dir):
+        if name.endswith('.py') or name == 'config.ini':
+            shutil.copy(os.path.join(source_dir, name), work_dir)
+    for name in APP_FILES:
+        if os.path.isdir(os.path.join(source_dir, name)):
+            shutil.copytree(os.path.join(source_dir, name), os.path.join(work_dir, name))
+
+    config = configparser.ConfigParser()
+    config.read(os.path.join(work_dir, 'config.ini'))
+    config['WEB_SERVER']['port'] = str(port)
+    config['WEB_SERVER']['sse_port'] = '0'
+    config['DISK_MONITOR']['disk_path'] = '/'
+    config['DISK_MONITOR']['disk_paths'] = ''
+    config['DISK_MONITOR']['log_to_console'] = 'False'
+    with open(os.path.join(work_dir, 'config.ini'), 'w') as f:
+        config.write(f)
+
+def time_command(args, cwd):
+    start = time.perf_counter()
+    subprocess.run(args, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def slowest_imports(cwd, count=8):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=cwd,
+                            capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+def time_to_first_response(cwd, port, timeout=60):
+    # INVOCATION_ID makes the app behave as if systemd started it, so it leaves the unit file alone
+    env = dict(os.environ, INVOCATION_ID='benchmark')
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=cwd, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            for scheme in ('https', 'http'):
+                try:
+                    urllib.request.urlopen(f'{scheme}://127.0.0.1:{port}/disk_stats', timeout=1,
+                                           context=context if scheme == 'https' else None).read()
+                    return time.perf_counter() - start
+                except (OSError, ssl.SSLError):
+                    pass
+            time.sleep(0.01)
+        raise RuntimeError("app did not answer in time")
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(30)
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix='disk_monitor_startup_')
+    port = free_port()
+    try:
+        prepare(work_dir, port)
+        interpreter = statistics.median(time_command([sys.executable, '-c', 'pass'], work_dir) for _ in range(RUNS))
+        first = time_to_first_response(work_dir, port)
+        imports = statistics.median(time_command([sys.executable, '-c', 'import app; app.shutdown()'], work_dir)
+                                    for _ in range(RUNS))
+        warm = [time_to_first_response(work_dir, port) for _ in range(RUNS)]
+
+        rows = [
+            ("interpreter start", interpreter, ""),
+            ("import app (includes first sample)", imports - interpreter, ""),
+            ("first response, first start", first, " (generates keys)"),
+            ("first response, restart", statistics.median(warm), f" (median of {RUNS})"),
+        ]
+        for label, seconds, note in rows:
+            print(f"{label + ':':<36} {seconds * 1000:7.0f} ms{note}")
+        print("slowest imports (cumulative):")
+        for micros, name in slowest_imports(work_dir):
+            print(f"  {micros / 1000:7.1f} ms {name}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import os
+import time
+import shutil
+import tempfile
+from py_vapid import Vapid
+from config_manager import ConfigManager
+from generate_vapid_keys import generate_vapid_keys
+from vapid import VapidSigner
+
+SUBSCRIPTIONS = 1000
+# a real fleet spreads over a handful of push services
+ORIGINS = ['https://fcm.googleapis.com', 'https://updates.push.services.mozilla.com',
+           'https://web.push.apple.com', 'https://wns2-par02p.notify.windows.com']
+
+def sign_per_message(private_key_file, subject, endpoints):
+    # what webpush() does when it is given the key file path: parse the key and sign for every call
+    for endpoint in endpoints:
+        vapid = Vapid.from_file(private_key_file=private_key_file)
+        audience = '/'.join(endpoint.split('/', 3)[:3])
+        vapid.sign({'sub': subject, 'aud': audience, 'exp': int(time.time()) + 12 * 3600})
+
+def sign_cached(signer, endpoints):
+    for endpoint in endpoints:
+        signer.headers(endpoint)
+
+def measure(function, *args):
+    start = time.process_time()
+    function(*args)
+    return time.process_time() - start
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix='disk_monitor_vapid_')
+    try:
+        config_manager = ConfigManager(os.path.join(work_dir, 'config.ini'))
+        config_manager.set('NOTIFICATIONS', 'vapid_public_key', os.path.join(work_dir, 'vapid_public_key.txt'))
+        config_manager.set('NOTIFICATIONS', 'vapid_private_key', os.path.join(work_dir, 'vapid_private_key.pem'))
+        generate_vapid_keys(config_manager)
+        private_key_file = config_manager.get('NOTIFICATIONS', 'vapid_private_key')
+        subject = config_manager.get('NOTIFICATIONS', 'vapid_email')
+        endpoints = [f"{ORIGINS[i % len(ORIGINS)]}/push/{i}" for i in range(SUBSCRIPTIONS)]
+
+        uncached = measure(sign_per_message, private_key_file, subject, endpoints)
+        # a fresh signer per fan-out includes loading the key and signing once per origin
+        cold = measure(lambda: sign_cached(VapidSigner(private_key_file, subject), endpoints))
+        signer = VapidSigner(private_key_file, subject)
+        sign_cached(signer, endpoints)
+        warm = measure(sign_cached, signer, endpoints)
+
+        print(f"{SUBSCRIPTIONS} subscriptions over {len(ORIGINS)} push services, CPU time per message:")
+        print(f"  parse key and sign every message: {uncached / SUBSCRIPTIONS * 1e6:8.1f} us")
+        print(f"  cached signer, first fan-out:     {cold / SUBSCRIPTIONS * 1e6:8.1f} us")
+        print(f"  cached signer, later fan-outs:    {warm / SUBSCRIPTIONS * 1e6:8.1f} us")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,79 @@
 import os
+import threading
 import configparser
+from types import MappingProxyType
 
 # Import the helper functions for path management
 from utils import  get_base_path, get_resource_path
 
+_INVALID = object()
+
+def _strtobool(value):
+    if isinstance(value, str):
+        value = value.lower()
+        if value in ('y', 'yes', 't', 'true', 'on', '1'):
+            return True
+        if value in ('n', 'no', 'f', 'false', 'off', '0'):
+            return False
+    return False
+
+def _cast(value, cast_as):
+    try:
+        if cast_as is bool:
+            return _strtobool(value)
+        return cast_as(value)
+    except (ValueError, TypeError):
+        return _INVALID
+
+class ConfigSnapshot:
+    """One immutable, typed version of the configuration.
+
+    Every value is compiled once: `_path`/`_file` keys are joined with the base
+    path and the rest are cast to str, int, float and bool up front, so get()
+    is a single dict lookup. A reload builds a new snapshot and swaps it in, so
+    readers always see one consistent version.
+    """
+
+    def __init__(self, settings, base_dir, version=1):
+        self.version = version
+        self.settings = MappingProxyType({section: MappingProxyType(dict(values)) for section, values in settings.items()})
+        self._values = {}
+        for section, values in settings.items():
+            for key, raw in values.items():
+                if key.endswith('_path') or key.endswith('_file'):
+                    # paths are returned resolved whatever cast is asked for
+                    path = os.path.join(base_dir, raw)
+                    compiled = {None: raw, str: path, int: path, float: path, bool: path}
+                else:
+                    compiled = {None: raw, str: raw, bool: _strtobool(raw), int: _cast(raw, int), float: _cast(raw, float)}
+                self._values[(section, key)] = compiled
+
+    def get(self, section, key, cast_as=str):
+        compiled = self._values.get((section, key))
+        if compiled is None:
+            return None
+        value = compiled.get(cast_as, _INVALID)
+        if value is _INVALID:
+            value = _cast(compiled[None], cast_as)
+        if value is _INVALID:
+            print(f"Error casting value '{compiled[None]}' to type '{cast_as.__name__}'")
+            return None
+        return value
+
+    def validate(self):
+        """Raises ValueError for settings that contradict each other."""
+        usage_threshold = self.get('DISK_MONITOR', 'usage_threshold', float)
+        critical_threshold = self.get('DISK_MONITOR', 'critical_threshold', float)
+        if usage_threshold and critical_threshold and critical_threshold < usage_threshold:
+            raise ValueError(f"critical_threshold ({critical_threshold:g}) is below usage_threshold "
+                             f"({usage_threshold:g}) in [DISK_MONITOR]; set it higher, or 0 to disable it.")
+
+    def changed_keys(self, other):
+        """(section, key) pairs whose raw value differs between this snapshot and `other`."""
+        keys = set(self._values) | set(other._values)
+        return {key for key in keys
+                if (self._values.get(key) or {}).get(None) != (other._values.get(key) or {}).get(None)}
+
 class ConfigManager:
     def __init__(self, config_file='config.ini'):
         base_dir = get_base_path()
@@ -15,12 +85,49 @@ class ConfigManager:
                 'port': '6161',
                 'ssl_cert_path': 'cert.pem', 
                 'ssl_key_path': 'key.pem',
+                'sse_port': '6162',
+                'sse_max_clients': '1000',
+                'server_mode': 'production',
+                'server_threads': '16',
+                'server_timeout_seconds': '10',
             },
             'DISK_MONITOR': {
                 'disk_path': '/',
                 'log_file': 'disk_monitor.log',
+                'log_to_console': 'True',
+                'log_max_bytes': '10485760',
+                'log_max_age_hours': '0',
+                'log_backup_count': '5',
                 'usage_threshold': '50',
                 'check_interval_minutes': '5',
+                'adaptive_interval': 'True',
+                'min_check_interval_seconds': '15',
+                'max_check_interval_minutes': '15',
+                'disk_paths': '',
+                'auto_discover': 'False',
+                'exclude_fstypes': 'proc,sysfs,devtmpfs,devpts,tmpfs,securityfs,cgroup,cgroup2,pstore,bpf,debugfs,tracefs,configfs,fusectl,mqueue,hugetlbfs,autofs,binfmt_misc,squashfs,overlay,nsfs,rpc_pipefs,efivarfs,ramfs',
+                'max_workers': '8',
+                'mount_timeout_seconds': '10',
+                'history_capacity': '10080',
+                'persist_history': 'True',
+                'history_path': 'history',
+                'forecast_window_minutes': '360',
+                'forecast_warning_hours': '24',
+                'critical_threshold': '90',
+                'hysteresis_percent': '2',
+                'inode_threshold': '0',
+                'inode_critical_threshold': '0',
+                'top_writers': '5',
+                'usage_scan_depth': '3',
+                'usage_top_n': '20',
+                'usage_scan_workers': '8',
+                'usage_scan_interval_minutes': '0',
+                'use_usage_index': 'False',
+                'usage_index_file': 'usage_index.db',
+                'usage_full_rescan_hours': '24',
+                'retention_unit_depth': '2',
+                'retention_target_percent': '0',
+                'config_reload_seconds': '10',
             },
             'NOTIFICATIONS': {
                 'enable_notifications': 'True',
@@ -28,6 +135,24 @@ class ConfigManager:
                 'vapid_private_key': 'vapid_private_key.pem',
                 'vapid_email': 'mailto:your.email@example.com',
                 'subscription_file': 'subscriptions.json',
+                'subscription_db_file': 'subscriptions.db',
+                'push_max_workers': '16',
+                'push_timeout_seconds': '10',
+                'alert_cooldown_minutes': '15',
+                'renotify_interval_minutes': '60',
+                'outbox_db_file': 'outbox.db',
+                'retry_base_seconds': '5',
+                'retry_max_seconds': '900',
+                'outbox_max_age_hours': '24',
+            },
+            'FLEET': {
+                'nodes': '',
+                'poll_interval_seconds': '60',
+                'poll_timeout_seconds': '5',
+                'stale_after_seconds': '180',
+                'poll_workers': '32',
+                'ca_file': '',
+                'insecure': 'False',
             },
             'SERVICE': {
                 'service_name': 'disk_monitor.service',
@@ -36,17 +161,15 @@ class ConfigManager:
                 'group': 'pacs',
             },
         }
+        self._snapshot = None
+        self._mtime_ns = None
+        self._listeners = []
+        self._reload_lock = threading.Lock()
         self.generate_config()
         self.read_config()
 
     def _strtobool_custom(self, value):
-        if isinstance(value, str):
-            value = value.lower()
-            if value in ('y', 'yes', 't', 'true', 'on', '1'):
-                return True
-            if value in ('n', 'no', 'f', 'false', 'off', '0'):
-                return False
-        return False
+        return _strtobool(value)
         
     def generate_config(self):
         updated = False
@@ -71,11 +194,72 @@ class ConfigManager:
 
     def read_config(self):
         self.config.read(self.config_file)
-        self.settings = {}
-        for section in self.config.sections():
-            self.settings[section] = dict(self.config.items(section))
+        self._mtime_ns = self._config_mtime()
+        self._compile()
         print("Configuration settings loaded.")
 
+    @property
+    def settings(self):
+        return self._snapshot.settings
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def _config_mtime(self):
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _compile(self, config=None):
+        """Builds and swaps in a snapshot of `config` (default: the current one); an invalid one is rejected."""
+        config = self.config if config is None else config
+        settings = {section: dict(config.items(section)) for section in config.sections()}
+        previous = self._snapshot
+        snapshot = ConfigSnapshot(settings, get_base_path(), previous.version + 1 if previous else 1)
+        snapshot.validate()
+        self.config = config
+        self._snapshot = snapshot
+        return snapshot.changed_keys(previous) if previous else set()
+
+    def add_listener(self, callback):
+        """Registers callback(changed_keys) to run after every reload that changed something."""
+        self._listeners.append(callback)
+
+    def reload(self):
+        """Re-reads config.ini, swaps in a new snapshot and returns the changed (section, key) pairs."""
+        with self._reload_lock:
+            config = configparser.ConfigParser()
+            for section, settings in self._default_config.items():
+                config[section] = settings
+            mtime_ns = self._config_mtime()
+            config.read(self.config_file)
+            # an invalid file keeps the previous configuration, and is read again once it changes
+            self._mtime_ns = mtime_ns
+            changed = self._compile(config)
+        if changed:
+            print(f"Configuration reloaded, {len(changed)} settings changed.")
+            for callback in self._listeners:
+                callback(changed)
+        return changed
+
+    def reload_if_changed(self):
+        """Reloads when config.ini's mtime moved since the last read."""
+        if self._config_mtime() != self._mtime_ns:
+            return self.reload()
+        return set()
+
+    def set(self, section, key, value):
+        """Overrides one setting in memory without writing config.ini."""
+        with self._reload_lock:
+            config = configparser.ConfigParser()
+            config.read_dict({name: dict(self.config.items(name, raw=True)) for name in self.config.sections()})
+            if section not in config:
+                config[section] = {}
+            config[section][key] = str(value)
+            self._compile(config)
+
     def write_config(self):
         try:
             config_dir = os.path.dirname(self.config_file)
@@ -88,17 +272,4 @@ class ConfigManager:
             print(f"Error writing to configuration file '{self.config_file}': {e}")
             
     def get(self, section, key, cast_as=str):
-        value = self.settings.get(section, {}).get(key)        
-        if value is None:
-            return None
-        # Automatically construct a full path for file-related settings
-        if key.endswith('_path') or key.endswith('_file'):
-            base_dir = get_base_path()
-            return os.path.join(base_dir, value)
-        try:
-            if cast_as is bool:
-                return self._strtobool_custom(value)
-            return cast_as(value)
-        except (ValueError, TypeError) as e:
-            print(f"Error casting value '{value}' to type '{cast_as.__name__}': {e}")
-            return None
\ No newline at end of file
+        return self._snapshot.get(section, key, cast_as)
@@ -0,0 +1,339 @@
+import os
+import re
+import mmap
+import struct
+import hashlib
+import threading
+from array import array
+
+class RingSeries:
+    """Fixed-capacity ring of (timestamp, used bytes, free bytes) samples.
+
+    Samples are kept in flat typed arrays, 24 bytes per sample, and the oldest
+    sample is overwritten once the ring is full. Timestamps must be appended in
+    increasing order so range lookups can use binary search.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.used = array('q', bytes(8 * capacity))
+        self.free = array('q', bytes(8 * capacity))
+        self.cursor = 0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def append(self, timestamp, used, free):
+        with self.lock:
+            if self.count and timestamp < self.timestamps[(self.cursor - 1) % self.capacity]:
+                return
+            self.timestamps[self.cursor] = timestamp
+            self.used[self.cursor] = used
+            self.free[self.cursor] = free
+            self.cursor = (self.cursor + 1) % self.capacity
+            if self.count < self.capacity:
+                self.count += 1
+            self._store_cursor()
+
+    def _store_cursor(self):
+        pass
+
+    def _physical(self, i):
+        return (self.cursor - self.count + i) % self.capacity
+
+    def _bisect(self, timestamp, right=False):
+        # index of the first logical sample at or after timestamp (after it when right is set)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self.timestamps[self._physical(mid)]
+            if value < timestamp or (right and value == timestamp):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _segments(self, lo, hi):
+        # the logical range [lo, hi) as at most two contiguous physical slices
+        if lo >= hi:
+            return []
+        start = self._physical(lo)
+        end = start + (hi - lo)
+        if end <= self.capacity:
+            return [(start, end)]
+        return [(start, self.capacity), (0, end - self.capacity)]
+
+    def last(self):
+        with self.lock:
+            if not self.count:
+                return None
+            i = (self.cursor - 1) % self.capacity
+            return self.timestamps[i], self.used[i], self.free[i]
+
+    def _iter_range(self, start, end):
+        # caller holds the lock; slices of the mapped buffers are views, so nothing is copied there
+        lo = self._bisect(start)
+        hi = self._bisect(end, right=True)
+        for a, b in self._segments(lo, hi):
+            yield from zip(self.timestamps[a:b], self.used[a:b], self.free[a:b])
+
+    def range(self, start, end):
+        """Returns (timestamps, used, free) arrays of every sample with start <= timestamp <= end."""
+        timestamps, used, free = array('d'), array('q'), array('q')
+        with self.lock:
+            for timestamp, used_bytes, free_bytes in self._iter_range(start, end):
+                timestamps.append(timestamp)
+                used.append(used_bytes)
+                free.append(free_bytes)
+        return timestamps, used, free
+
+    def query(self, start, end, points):
+        """Downsamples the samples between start and end into at most `points` buckets.
+
+        Every bucket carries min/max/avg of the used bytes and used percent.
+        """
+        points = max(1, points)
+        buckets = []
+        with self.lock:
+            lo = self._bisect(start)
+            hi = self._bisect(end, right=True)
+            if lo >= hi:
+                return []
+            first = self.timestamps[self._physical(lo)]
+            last = self.timestamps[self._physical(hi - 1)]
+            width = (last - first) / points or 1.0
+
+            current = None
+            for timestamp, used_bytes, free_bytes in self._iter_range(start, end):
+                index = min(int((timestamp - first) / width), points - 1)
+                size = used_bytes + free_bytes
+                percent = used_bytes * 100.0 / size if size else 0.0
+                if current is None or current[0] != index:
+                    current = [index, timestamp, 0, used_bytes, used_bytes, 0, percent, percent, 0.0, free_bytes]
+                    buckets.append(current)
+                current[2] += 1
+                if used_bytes < current[3]:
+                    current[3] = used_bytes
+                if used_bytes > current[4]:
+                    current[4] = used_bytes
+                current[5] += used_bytes
+                if percent < current[6]:
+                    current[6] = percent
+                if percent > current[7]:
+                    current[7] = percent
+                current[8] += percent
+                current[9] = free_bytes
+
+        return [
+            {
+                'timestamp': bucket[1],
+                'samples': bucket[2],
+                'used_min': bucket[3],
+                'used_max': bucket[4],
+                'used_avg': bucket[5] // bucket[2],
+                'percent_min': round(bucket[6], 2),
+                'percent_max': round(bucket[7], 2),
+                'percent_avg': round(bucket[8] / bucket[2], 2),
+                'free': bucket[9],
+            }
+            for bucket in buckets
+        ]
+
+class DiskHistory:
+    """Sample history of every monitored path, one RingSeries per path."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _create_series(self, disk_path):
+        return RingSeries(self.capacity)
+
+    def series(self, disk_path, create=False):
+        series = self._series.get(disk_path)
+        if series is None and create:
+            with self._lock:
+                series = self._series.get(disk_path)
+                if series is None:
+                    series = self._create_series(disk_path)
+                    self._series[disk_path] = series
+        return series
+
+    def paths(self):
+        return list(self._series)
+
+    def record(self, disk_path, timestamp, used, free):
+        self.series(disk_path, create=True).append(timestamp, used, free)
+
+    def record_stats(self, stats, timestamp):
+        """Records every volume of a multi_disk_stats result that has a usage sample."""
+        for disk_path, volume_stats in stats.items():
+            usage_bytes = volume_stats.get('disk_usage_bytes')
+            if usage_bytes:
+                self.record(disk_path, timestamp, usage_bytes['used'], usage_bytes['free'])
+
+    def query(self, disk_path, start, end, points):
+        series = self.series(disk_path)
+        if series is None:
+            return None
+        return series.query(start, end, points)
+
+    def close(self):
+        pass
+
+class MappedRingSeries(RingSeries):
+    """RingSeries whose arrays live in a memory-mapped file.
+
+    The file is a 64 byte header (magic, schema version, length of the disk
+    path, capacity, write cursor and sample count) followed by the timestamp,
+    used and free arrays and the UTF-8 disk path the file belongs to. Appends
+    are plain memory writes and opening the file costs the same no matter how
+    much history it holds. Version 1 files have no path and are carried over
+    into version 2 when opened.
+    """
+
+    MAGIC = b'DMHIST\0\0'
+    VERSION = 2
+    HEADER = struct.Struct('<8sIIqqq')
+    HEADER_SIZE = 64
+
+    def __init__(self, history_file, capacity, disk_path=''):
+        self.history_file = history_file
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        path_bytes = disk_path.encode('utf-8')
+        self._path_length = len(path_bytes)
+
+        size = self.HEADER_SIZE + 24 * capacity + self._path_length
+        header = self._read_header(history_file)
+        previous = None
+        if header is None or header[3] != capacity or self._read_path(history_file, header) != path_bytes:
+            if header is not None:
+                previous = self._read_samples(history_file, header)
+            with open(history_file, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self._path_length, capacity, 0, 0))
+                f.truncate(size - self._path_length)
+                f.seek(size - self._path_length)
+                f.write(path_bytes)
+
+        self._file = open(history_file, 'r+b')
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        view = memoryview(self._mmap)
+        offset = self.HEADER_SIZE
+        self.timestamps = view[offset:offset + 8 * capacity].cast('d')
+        offset += 8 * capacity
+        self.used = view[offset:offset + 8 * capacity].cast('q')
+        offset += 8 * capacity
+        self.free = view[offset:offset + 8 * capacity].cast('q')
+        view.release()
+
+        _, _, _, _, self.cursor, self.count = self.HEADER.unpack_from(self._mmap, 0)
+        if previous is not None:
+            for sample in zip(*previous):
+                self.append(*sample)
+
+    @classmethod
+    def _read_header(cls, history_file):
+        # the header of a well-formed history file, None for a missing or foreign file
+        try:
+            with open(history_file, 'rb') as f:
+                data = f.read(cls.HEADER.size)
+            file_size = os.path.getsize(history_file)
+        except OSError:
+            return None
+        if len(data) < cls.HEADER.size:
+            return None
+        header = cls.HEADER.unpack(data)
+        magic, version, path_length, capacity, cursor, count = header
+        if magic != cls.MAGIC or version not in (1, cls.VERSION) or capacity <= 0:
+            return None
+        if version == 1:
+            path_length = 0
+        if file_size != cls.HEADER_SIZE + 24 * capacity + path_length or not 0 <= cursor < capacity or not 0 <= count <= capacity:
+            return None
+        return header
+
+    @classmethod
+    def _read_path(cls, history_file, header):
+        # the encoded disk path stored after the samples, None for a version 1 file
+        _, version, path_length, capacity, _, _ = header
+        if version == 1:
+            return None
+        try:
+            with open(history_file, 'rb') as f:
+                f.seek(cls.HEADER_SIZE + 24 * capacity)
+                return f.read(path_length)
+        except OSError:
+            return None
+
+    @classmethod
+    def disk_path(cls, history_file):
+        """The disk path a history file belongs to, read from the file alone; None for foreign and version 1 files."""
+        header = cls._read_header(history_file)
+        path_bytes = cls._read_path(history_file, header) if header is not None else None
+        if not path_bytes:
+            return None
+        try:
+            return path_bytes.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+
+    @classmethod
+    def _read_samples(cls, history_file, header):
+        # samples of a file written with another capacity, oldest first, so they can be carried over
+        _, _, _, capacity, cursor, count = header
+        start = (cursor - count) % capacity
+        arrays = []
+        with open(history_file, 'rb') as f:
+            f.seek(cls.HEADER_SIZE)
+            for typecode in 'dqq':
+                values = array(typecode)
+                values.fromfile(f, capacity)
+                arrays.append((values[start:] + values[:start])[:count])
+        return arrays
+
+    def _store_cursor(self):
+        self.HEADER.pack_into(self._mmap, 0, self.MAGIC, self.VERSION, self._path_length, self.capacity, self.cursor, self.count)
+
+    def close(self):
+        with self.lock:
+            self.timestamps.release()
+            self.used.release()
+            self.free.release()
+            self._mmap.flush()
+            self._mmap.close()
+            self._file.close()
+
+class PersistentDiskHistory(DiskHistory):
+    """DiskHistory keeping one MappedRingSeries file per path under `history_path`.
+
+    Every file names its disk path, so the files found at startup are opened
+    right away and their history is served before the path is sampled again.
+    """
+
+    def __init__(self, capacity, history_path):
+        super().__init__(capacity)
+        self.history_path = history_path
+        os.makedirs(history_path, exist_ok=True)
+        for name in sorted(os.listdir(history_path)):
+            if not name.endswith('.hist'):
+                continue
+            disk_path = MappedRingSeries.disk_path(os.path.join(history_path, name))
+            # a renamed or copied file is not the one its path would open
+            if disk_path is not None and self.history_file(disk_path) == os.path.join(history_path, name):
+                self._series[disk_path] = self._create_series(disk_path)
+
+    def history_file(self, disk_path):
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', disk_path).strip('_') or 'root'
+        digest = hashlib.sha1(disk_path.encode('utf-8')).hexdigest()[:8]
+        return os.path.join(self.history_path, f"{slug}-{digest}.hist")
+
+    def _create_series(self, disk_path):
+        return MappedRingSeries(self.history_file(disk_path), self.capacity, disk_path)
+
+    def close(self):
+        with self._lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
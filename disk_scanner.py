@@ -1,15 +1,64 @@
+import os
+import math
+import time
 import psutil
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from logger import Logger
+from io_stats import IoRateTracker, mount_devices, device_for_path
+from process_io import ProcessWriteTracker
 
-def disk_stats(config_manager, logger):
+_executor = None
+_executor_workers = 0
+# futures of mounts that did not answer in time, kept so a hung mount never gets a second worker
+_pending = {}
+_io_rates = IoRateTracker()
+_process_writes = ProcessWriteTracker()
+
+def get_disk_paths(config_manager):
+    if config_manager.get('DISK_MONITOR', 'auto_discover', bool):
+        excluded = config_manager.get('DISK_MONITOR', 'exclude_fstypes') or ''
+        excluded = {fstype.strip() for fstype in excluded.split(',') if fstype.strip()}
+        paths = []
+        for partition in psutil.disk_partitions(all=True):
+            if partition.fstype in excluded or partition.mountpoint in paths:
+                continue
+            paths.append(partition.mountpoint)
+        return paths
+
+    configured = config_manager.get('DISK_MONITOR', 'disk_paths') or ''
+    paths = [path.strip() for path in configured.split(',') if path.strip()]
+    if not paths:
+        paths = [config_manager.get('DISK_MONITOR', 'disk_path')]
+    return paths
+
+def inode_usage(disk_path):
+    """Inode totals of the filesystem holding `disk_path`, or None where it has no fixed inode table."""
+    if not hasattr(os, 'statvfs'):
+        return None
+    st = os.statvfs(disk_path)
+    if not st.f_files:
+        return None
+    used = st.f_files - st.f_ffree
+    return {
+        'total': st.f_files,
+        'used': used,
+        'free': st.f_favail,
+        'percent': round(used / st.f_files * 100, 1)
+    }
+
+def disk_stats(config_manager, logger, disk_path=None):
     data = None
-    disk_path = config_manager.get('DISK_MONITOR', 'disk_path')
+    if disk_path is None:
+        disk_path = config_manager.get('DISK_MONITOR', 'disk_path')
     usage_threshold = config_manager.get('DISK_MONITOR', 'usage_threshold', int)
+    inode_threshold = config_manager.get('DISK_MONITOR', 'inode_threshold', float)
 
     try:
         disk_usage = psutil.disk_usage(disk_path)
-        
+        inodes = inode_usage(disk_path)
+        inodes_exceeded = bool(inode_threshold and inodes and inodes['percent'] >= inode_threshold)
+
         data = {
             'disk_path': disk_path,
             'usage_threshold': usage_threshold,
@@ -20,10 +69,16 @@ def disk_stats(config_manager, logger):
                 'free': round(disk_usage.free / (1024**3), 2),
                 'percent': disk_usage.percent
             },
-            'disk_status': 'OK' if disk_usage.percent < usage_threshold else 'WARNING',
+            'disk_usage_bytes': {
+                'total': disk_usage.total,
+                'used': disk_usage.used,
+                'free': disk_usage.free
+            },
+            'inodes': inodes,
+            'disk_status': 'OK' if disk_usage.percent < usage_threshold and not inodes_exceeded else 'WARNING',
             'check_interval_minutes': config_manager.get('DISK_MONITOR', 'check_interval_minutes', float)
         }
-        
+
         report_message = (
             f"Disk Usage Report for '{disk_path}':\n"
             f"    Total: {data['disk_usage']['total']} GB\n"
@@ -31,26 +86,107 @@ def disk_stats(config_manager, logger):
             f"    Free: {data['disk_usage']['free']} GB\n"
             f"    Percent Used: {data['disk_usage']['percent']}% (!{usage_threshold})\n"
         )
-        
+        if inodes:
+            report_message += f"    Inodes Used: {inodes['percent']}%" + (f" (!{inode_threshold})" if inode_threshold else "") + "\n"
+
         if data['disk_usage']['percent'] >= usage_threshold:
             report_message += f"    WARNING: Disk usage is above the {usage_threshold}% threshold!"
+        if inodes_exceeded:
+            report_message += f"    WARNING: Inode usage is above the {inode_threshold}% threshold!"
 
         logger.log(report_message, level="INFO")
-            
+
     except Exception as e:
-        logger.log(f"Error checking disk space: {e}", level="ERROR")
-    
+        logger.log(f"Error checking disk space on '{disk_path}': {e}", level="ERROR")
+
     return data
 
+def _get_executor(max_workers):
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != max_workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='disk_stats')
+        _executor_workers = max_workers
+    return _executor
+
+def _unavailable_stats(disk_path, status):
+    return {
+        'disk_path': disk_path,
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'disk_usage': None,
+        'disk_status': status,
+    }
+
+def multi_disk_stats(config_manager, logger):
+    """Samples every monitored mount in parallel and returns the results keyed by mount.
+
+    A mount that does not answer within `mount_timeout_seconds` is reported as
+    UNRESPONSIVE and is not sampled again until its previous call returns.
+    Every sampled volume also gets the I/O rates of its block device, all taken
+    from a single `disk_io_counters` reading per call, and the processes that
+    wrote most to it since the previous call when `top_writers` is set.
+    """
+    disk_paths = get_disk_paths(config_manager)
+    max_workers = max(1, config_manager.get('DISK_MONITOR', 'max_workers', int) or 1)
+    mount_timeout = config_manager.get('DISK_MONITOR', 'mount_timeout_seconds', float) or 10.0
+    executor = _get_executor(max_workers)
+
+    results = {}
+    futures = {}
+    for disk_path in disk_paths:
+        pending = _pending.get(disk_path)
+        if pending is not None:
+            if not pending.done():
+                results[disk_path] = _unavailable_stats(disk_path, 'UNRESPONSIVE')
+                continue
+            del _pending[disk_path]
+        futures[disk_path] = executor.submit(disk_stats, config_manager, logger, disk_path)
+
+    if futures:
+        # mounts queued behind others still get a full timeout once a worker is free
+        rounds = math.ceil(len(futures) / max_workers)
+        wait(futures.values(), timeout=mount_timeout * rounds)
+
+    devices = {}
+    try:
+        _io_rates.update(psutil.disk_io_counters(perdisk=True) or {}, time.monotonic())
+        devices = mount_devices()
+    except Exception as e:
+        logger.log(f"Error reading disk I/O counters: {e}", level="ERROR")
+
+    for disk_path, future in futures.items():
+        if not future.done():
+            _pending[disk_path] = future
+            logger.log(f"Disk '{disk_path}' did not respond within {mount_timeout} seconds.", level="ERROR")
+            results[disk_path] = _unavailable_stats(disk_path, 'UNRESPONSIVE')
+            continue
+        stats = future.result()
+        if stats:
+            stats['io'] = _io_rates.rates(device_for_path(disk_path, devices))
+        results[disk_path] = stats if stats else _unavailable_stats(disk_path, 'ERROR')
+
+    top_n = config_manager.get('DISK_MONITOR', 'top_writers', int)
+    if top_n:
+        sampled = {disk_path: device_for_path(disk_path, devices) for disk_path, stats in results.items()
+                   if stats.get('disk_usage')}
+        try:
+            writers = _process_writes.top_writers(sampled, devices, time.monotonic(), top_n)
+        except Exception as e:
+            logger.log(f"Error reading process I/O counters: {e}", level="ERROR")
+            writers = {}
+        for disk_path in sampled:
+            results[disk_path]['top_writers'] = writers.get(disk_path, [])
+
+    return {disk_path: results[disk_path] for disk_path in disk_paths}
+
 if __name__ == '__main__':
     from config_manager import ConfigManager
     config_manager = ConfigManager()
-    disk_path = config_manager.get('DISK_MONITOR', 'disk_path')
     log_file_path = config_manager.get('DISK_MONITOR', 'log_file')
-    usage_threshold = config_manager.get('DISK_MONITOR', 'usage_threshold', int)
     logger = Logger(log_file_path)
 
     print(f"Running disk space check...")
-    stats = disk_stats(config_manager, logger)
+    stats = multi_disk_stats(config_manager, logger)
     if stats:
-        print(f"Stats returned: {stats}")
\ No newline at end of file
+        print(f"Stats returned: {stats}")
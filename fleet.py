@@ -0,0 +1,220 @@
+import os
+import re
+import time
+import warnings
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+OK = 'ok'
+STALE = 'stale'
+DOWN = 'down'
+
+def parse_nodes(value):
+    """Parses `name=url, url, ...` into (name, base_url) pairs; the name defaults to host:port."""
+    nodes = []
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, url = entry.partition('=') if '=' in entry.split('://', 1)[0] else ('', '', entry)
+        url = url.strip().rstrip('/')
+        if url.endswith('/disk_stats'):
+            url = url[:-len('/disk_stats')]
+        nodes.append((name.strip() or urlsplit(url).netloc, url))
+    return nodes
+
+def _valid_stats(stats):
+    """True for a `/disk_stats` keyed by mount point; an older or different service answers something else."""
+    if not isinstance(stats, dict):
+        return False
+    for volume_stats in stats.values():
+        if not isinstance(volume_stats, dict):
+            return False
+        disk_usage = volume_stats.get('disk_usage')
+        if disk_usage is not None and not (isinstance(disk_usage, dict) and isinstance(disk_usage.get('percent'), (int, float))
+                                           and isinstance(volume_stats.get('usage_threshold'), (int, float))):
+            return False
+    return True
+
+class FleetNode:
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url
+        self.stats = {}
+        self.etag = None
+        self.last_attempt_at = None
+        self.last_success_at = None
+        self.latency_ms = None
+        self.error = None
+        self.in_flight = None
+        self.session = None
+
+    def status(self, now, stale_after_seconds):
+        """ok when the last poll answered, stale while failing polls still have recent data, else down."""
+        if self.last_success_at is None or now - self.last_success_at > stale_after_seconds:
+            return DOWN
+        if self.error is not None:
+            return STALE
+        return OK
+
+class FleetPoller:
+    """Polls `/disk_stats` of many disk_monitor nodes at once.
+
+    Every node has its own keep-alive session and is asked with If-None-Match,
+    so an unchanged node answers 304 without a body. Requests run on a shared
+    pool and every node gets `timeout` seconds; poll() returns once all nodes
+    answered or the timeout passed, so one slow node never holds up the round.
+    A node still busy from an earlier round is skipped instead of queued twice.
+    """
+
+    def __init__(self, nodes, timeout=5, stale_after_seconds=180, max_workers=32, verify=True):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self._requests = requests
+        self.nodes = [FleetNode(name, url) for name, url in nodes]
+        self._warning_filter = None
+        if verify is False:
+            # silence the unverified HTTPS warning for the fleet's own hosts only
+            from urllib3.exceptions import InsecureRequestWarning
+            hosts = '|'.join(sorted({re.escape(urlsplit(node.url).hostname or '') for node in self.nodes}))
+            warnings.filterwarnings('ignore', message=f"Unverified HTTPS request is being made to host '(?:{hosts})'",
+                                    category=InsecureRequestWarning)
+            self._warning_filter = warnings.filters[0]
+        self.timeout = timeout
+        self.stale_after_seconds = stale_after_seconds
+        self.verify = verify
+        for node in self.nodes:
+            node.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            node.session.mount('https://', adapter)
+            node.session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(self.nodes))),
+                                            thread_name_prefix='fleet')
+        self._lock = threading.Lock()
+
+    def _fetch(self, node):
+        headers = {'If-None-Match': node.etag} if node.etag else {}
+        started = time.perf_counter()
+        try:
+            response = node.session.get(f"{node.url}/disk_stats", headers=headers,
+                                        timeout=self.timeout, verify=self.verify)
+            if response.status_code == 304:
+                stats, etag = None, node.etag
+            elif response.status_code == 200:
+                stats, etag = response.json(), response.headers.get('ETag')
+                if not _valid_stats(stats):
+                    raise ValueError("unexpected payload")
+            else:
+                raise ValueError(f"HTTP {response.status_code}")
+        except self._requests.Timeout:
+            error = f"no answer within {self.timeout:g} s"
+        except self._requests.ConnectionError:
+            error = "connection failed"
+        except (self._requests.RequestException, ValueError) as e:
+            error = str(e) or type(e).__name__
+        else:
+            error = None
+        if error is not None:
+            with self._lock:
+                node.error = error
+                node.latency_ms = None
+            return
+        with self._lock:
+            if stats is not None:
+                node.stats = stats
+            node.etag = etag
+            node.last_success_at = time.time()
+            node.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            node.error = None
+
+    def poll(self):
+        """Polls every node once and returns the seconds the round took."""
+        started = time.perf_counter()
+        now = time.time()
+        futures = []
+        for node in self.nodes:
+            if node.in_flight is not None and not node.in_flight.done():
+                continue
+            node.last_attempt_at = now
+            node.in_flight = self._executor.submit(self._fetch, node)
+            futures.append(node.in_flight)
+        wait(futures, timeout=self.timeout)
+        with self._lock:
+            for node in self.nodes:
+                if not node.in_flight.done():
+                    node.error = f"no answer within {self.timeout:g} s"
+        return time.perf_counter() - started
+
+    def view(self, now=None):
+        """The merged fleet: every node with its status and volumes, plus counts over the whole site."""
+        if now is None:
+            now = time.time()
+        summary = {'nodes': len(self.nodes), OK: 0, STALE: 0, DOWN: 0, 'volumes': 0, 'warning': 0, 'critical': 0}
+        nodes = {}
+        with self._lock:
+            for node in self.nodes:
+                status = node.status(now, self.stale_after_seconds)
+                summary[status] += 1
+                if not isinstance(node.stats, dict):
+                    continue
+                for volume_stats in node.stats.values():
+                    summary['volumes'] += 1
+                    alert_state = volume_stats.get('alert_state')
+                    if alert_state == 'WARNING':
+                        summary['warning'] += 1
+                    elif alert_state == 'CRITICAL':
+                        summary['critical'] += 1
+                nodes[node.name] = {
+                    'url': node.url,
+                    'status': status,
+                    'last_success_at': node.last_success_at,
+                    'age_seconds': round(now - node.last_success_at, 1) if node.last_success_at else None,
+                    'latency_ms': node.latency_ms,
+                    'error': node.error,
+                    'volumes': node.stats,
+                }
+        return {'generated_at': now, 'summary': summary, 'nodes': nodes}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        for node in self.nodes:
+            node.session.close()
+        if self._warning_filter is not None:
+            warnings.filters[:] = [f for f in warnings.filters if f is not self._warning_filter]
+            self._warning_filter = None
+
+_poller = None
+_poller_settings = None
+_poller_lock = threading.Lock()
+
+def get_fleet_poller(config_manager):
+    """Returns the poller for the `[FLEET]` nodes, or None when this instance is not an aggregator."""
+    global _poller, _poller_settings
+    ca_file = config_manager.get('FLEET', 'ca_file')
+    if config_manager.get('FLEET', 'insecure', bool):
+        verify = False
+    else:
+        verify = ca_file if ca_file and os.path.isfile(ca_file) else True
+    settings = (
+        tuple(parse_nodes(config_manager.get('FLEET', 'nodes'))),
+        config_manager.get('FLEET', 'poll_timeout_seconds', float) or 5,
+        config_manager.get('FLEET', 'stale_after_seconds', float) or 3 * (config_manager.get('FLEET', 'poll_interval_seconds', float) or 60),
+        config_manager.get('FLEET', 'poll_workers', int) or 32,
+        verify,
+    )
+    with _poller_lock:
+        if settings != _poller_settings:
+            if _poller is not None:
+                _poller.close()
+            _poller = FleetPoller(*settings) if settings[0] else None
+            _poller_settings = settings
+    return _poller
+
+def close_fleet_poller():
+    global _poller, _poller_settings
+    with _poller_lock:
+        if _poller is not None:
+            _poller.close()
+        _poller = None
+        _poller_settings = None
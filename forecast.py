@@ -0,0 +1,112 @@
+import threading
+from collections import deque
+
+class FillRateForecaster:
+    """Least-squares fill rate of one volume over a sliding time window.
+
+    The regression sums are updated as samples enter and leave the window, so
+    adding a sample is O(1) amortized no matter how short the interval is.
+    """
+
+    def __init__(self, window_seconds):
+        self.window_seconds = window_seconds
+        # a fit over a few seconds of samples is mostly noise, so wait for a tenth of the window
+        self.min_span_seconds = window_seconds / 10
+        self._samples = deque()
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self._origin_t = self._samples[0][0] if self._samples else 0.0
+        self._origin_y = self._samples[0][1] if self._samples else 0.0
+        self._n = 0
+        self._sum_t = self._sum_y = self._sum_tt = self._sum_ty = 0.0
+        self._since_reset = 0
+        for timestamp, used in self._samples:
+            self._add_to_sums(timestamp, used, 1)
+
+    def _add_to_sums(self, timestamp, used, sign):
+        # time and size are taken relative to an origin to keep the sums small enough for doubles
+        t = timestamp - self._origin_t
+        y = used - self._origin_y
+        self._n += sign
+        self._sum_t += sign * t
+        self._sum_y += sign * y
+        self._sum_tt += sign * t * t
+        self._sum_ty += sign * t * y
+
+    def add(self, timestamp, used):
+        if self._samples and timestamp <= self._samples[-1][0]:
+            return
+        self._samples.append((timestamp, used))
+        if len(self._samples) == 1:
+            self._reset_sums()
+            return
+        self._add_to_sums(timestamp, used, 1)
+        while self._samples[0][0] < timestamp - self.window_seconds:
+            self._add_to_sums(*self._samples.popleft(), -1)
+
+        # re-anchor once per window length of samples, which keeps the cost amortized O(1)
+        self._since_reset += 1
+        if self._since_reset > len(self._samples):
+            self._reset_sums()
+
+    def fill_rate(self):
+        """Bytes per second over the window, None until there are enough samples."""
+        if self._n < 3 or self._samples[-1][0] - self._samples[0][0] < self.min_span_seconds:
+            return None
+        denominator = self._n * self._sum_tt - self._sum_t * self._sum_t
+        if denominator <= 0:
+            return None
+        return (self._n * self._sum_ty - self._sum_t * self._sum_y) / denominator
+
+    def forecast(self, used, free, usage_threshold):
+        rate = self.fill_rate()
+        result = {
+            'fill_rate_bytes_per_hour': round(rate * 3600) if rate is not None else None,
+            'estimated_time_to_threshold': None,
+            'estimated_time_to_full': None,
+        }
+        if not rate or rate <= 0:
+            return result
+        threshold_bytes = (used + free) * usage_threshold / 100.0
+        if used < threshold_bytes:
+            result['estimated_time_to_threshold'] = round((threshold_bytes - used) / rate / 3600, 2)
+        else:
+            result['estimated_time_to_threshold'] = 0.0
+        result['estimated_time_to_full'] = round(free / rate / 3600, 2)
+        return result
+
+class DiskForecast:
+    """One FillRateForecaster per monitored path, seeded from the sample history on first use."""
+
+    def __init__(self, window_seconds, disk_history=None):
+        self.window_seconds = window_seconds
+        self.disk_history = disk_history
+        self._forecasters = {}
+        self._lock = threading.Lock()
+
+    def _forecaster(self, disk_path, now):
+        forecaster = self._forecasters.get(disk_path)
+        if forecaster is None:
+            with self._lock:
+                forecaster = self._forecasters.get(disk_path)
+                if forecaster is None:
+                    forecaster = FillRateForecaster(self.window_seconds)
+                    series = self.disk_history.series(disk_path) if self.disk_history else None
+                    if series is not None:
+                        timestamps, used, _ = series.range(now - self.window_seconds, now)
+                        for timestamp, used_bytes in zip(timestamps, used):
+                            forecaster.add(timestamp, used_bytes)
+                    self._forecasters[disk_path] = forecaster
+        return forecaster
+
+    def update_stats(self, stats, timestamp):
+        """Adds the samples of a multi_disk_stats result and attaches a 'forecast' to each volume."""
+        for disk_path, volume_stats in stats.items():
+            usage_bytes = volume_stats.get('disk_usage_bytes')
+            if not usage_bytes:
+                continue
+            forecaster = self._forecaster(disk_path, timestamp)
+            forecaster.add(timestamp, usage_bytes['used'])
+            volume_stats['forecast'] = forecaster.forecast(
+                usage_bytes['used'], usage_bytes['free'], volume_stats['usage_threshold'])
@@ -4,10 +4,6 @@ import socket
 import ipaddress
 from datetime import datetime, timedelta
 
-from cryptography import x509
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
 from utils import get_base_path
 from config_manager import ConfigManager
 
@@ -31,6 +27,11 @@ def generate_ssl_keys(config_manager):
         return
         
     print("Generating a new self-signed SSL certificate and key...")
+    # cryptography is only needed on the first start, so it is not imported with the module
+    from cryptography import x509
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
     try:
         key = rsa.generate_private_key(
             public_exponent=65537,
@@ -1,8 +1,6 @@
 import os
 import sys
 import base64
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import ec
 
 def generate_vapid_keys(config_manager):
     public_key_path = config_manager.get('NOTIFICATIONS', 'vapid_public_key')
@@ -13,7 +11,9 @@ def generate_vapid_keys(config_manager):
         return
 
     print("Generating new VAPID keys...")
-    
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
     try:
         private_key = ec.generate_private_key(ec.SECP256R1())
         
@@ -0,0 +1,104 @@
+import os
+import time
+from array import array
+import psutil
+
+# cumulative counters kept per device, in this order after the sample time
+_COUNTERS = ('read_bytes', 'write_bytes', 'read_count', 'write_count', 'read_time', 'write_time', 'busy_time')
+_TIME, _READ_BYTES, _WRITE_BYTES, _READ_COUNT, _WRITE_COUNT, _READ_TIME, _WRITE_TIME, _BUSY_TIME = range(8)
+
+def _device_name(device):
+    # /dev/mapper/vg-data resolves to /dev/dm-3; disk_io_counters uses the kernel name
+    if not device.startswith('/dev/'):
+        return None
+    return os.path.basename(os.path.realpath(device))
+
+def mount_devices():
+    """Returns a dict mapping every mount point to the kernel name of its block device."""
+    devices = {}
+    for partition in psutil.disk_partitions(all=True):
+        name = _device_name(partition.device)
+        if name:
+            devices[partition.mountpoint] = name
+    return devices
+
+def device_for_path(disk_path, devices):
+    """Kernel name of the device holding `disk_path`, found by the longest mount point containing it."""
+    path = os.path.realpath(disk_path)
+    best = None
+    for mountpoint in devices:
+        if path == mountpoint or path.startswith(mountpoint.rstrip('/') + '/'):
+            if best is None or len(mountpoint) > len(best):
+                best = mountpoint
+    return devices.get(best) if best else None
+
+class IoRateTracker:
+    """Turns consecutive `disk_io_counters(perdisk=True)` readings into rates per device.
+
+    Every device owns two fixed arrays, the previous counters and the current
+    rates, which are overwritten in place on each update. A device shows up in
+    rates() from its second reading on; a counter that went backwards (device
+    reattached, counter wrapped) restarts the device instead of reporting a
+    negative rate.
+    """
+
+    def __init__(self):
+        self._previous = {}
+        self._rates = {}
+
+    def update(self, counters, now=None):
+        if now is None:
+            now = time.monotonic()
+        for device, reading in counters.items():
+            previous = self._previous.get(device)
+            if previous is None:
+                previous = self._previous[device] = array('d', bytes(8 * 8))
+                previous[_TIME] = now
+                self._store(previous, reading)
+                continue
+
+            elapsed = now - previous[_TIME]
+            if elapsed <= 0:
+                continue
+            rates = self._rates.get(device)
+            if rates is None:
+                rates = self._rates[device] = array('d', bytes(8 * 8))
+            restarted = False
+            for index, name in enumerate(_COUNTERS, 1):
+                value = getattr(reading, name, 0)
+                delta = value - previous[index]
+                if delta < 0:
+                    restarted = True
+                rates[index] = delta
+                previous[index] = value
+            previous[_TIME] = now
+            if restarted:
+                del self._rates[device]
+                continue
+            rates[_TIME] = elapsed
+
+    @staticmethod
+    def _store(target, reading):
+        for index, name in enumerate(_COUNTERS, 1):
+            target[index] = getattr(reading, name, 0)
+
+    def rates(self, device):
+        """Throughput, IOPS, busy time and average latency of `device` over the last interval, or None."""
+        rates = self._rates.get(device) if device else None
+        if rates is None:
+            return None
+        elapsed = rates[_TIME]
+        read_count = rates[_READ_COUNT]
+        write_count = rates[_WRITE_COUNT]
+        return {
+            'device': device,
+            'interval_seconds': round(elapsed, 2),
+            'read_bytes_per_second': round(rates[_READ_BYTES] / elapsed),
+            'write_bytes_per_second': round(rates[_WRITE_BYTES] / elapsed),
+            'read_iops': round(read_count / elapsed, 2),
+            'write_iops': round(write_count / elapsed, 2),
+            # busy_time is only reported on Linux; elsewhere it stays 0
+            'busy_percent': round(min(100.0, rates[_BUSY_TIME] / (elapsed * 10)), 1),
+            'read_latency_ms': round(rates[_READ_TIME] / read_count, 2) if read_count else None,
+            'write_latency_ms': round(rates[_WRITE_TIME] / write_count, 2) if write_count else None,
+        }
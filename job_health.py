@@ -0,0 +1,90 @@
+import threading
+from array import array
+
+class JobRuns:
+    """The last `capacity` runs of one scheduled job in fixed-size arrays.
+
+    Each run takes 17 bytes: scheduled and start time, duration and whether it
+    failed. Runs that never started are only counted: `missed` when they were
+    later than the misfire grace time, `skipped` when the previous run was
+    still going.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self._scheduled = array('d', bytes(8 * capacity))
+        self._started = array('d', bytes(8 * capacity))
+        self._durations = array('d', bytes(8 * capacity))
+        self._failed = bytearray(capacity)
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.skipped = 0
+
+    def record(self, scheduled_at, started_at, duration, failed):
+        index = self.runs % self.capacity
+        # a run started by hand has no scheduled time and counts as on time
+        self._scheduled[index] = started_at if scheduled_at is None else scheduled_at
+        self._started[index] = started_at
+        self._durations[index] = duration
+        self._failed[index] = 1 if failed else 0
+        self.runs += 1
+        if failed:
+            self.errors += 1
+
+    def summary(self):
+        count = min(self.runs, self.capacity)
+        summary = {
+            'runs': self.runs, 'errors': self.errors, 'missed': self.missed, 'skipped': self.skipped,
+            'window': count, 'window_errors': sum(self._failed[:count]),
+            'last_started_at': None, 'last_duration_seconds': None, 'last_outcome': None,
+            'duration_seconds': None, 'lag_seconds': None,
+        }
+        if not count:
+            return summary
+        last = (self.runs - 1) % self.capacity
+        durations = sorted(self._durations[:count])
+        lags = sorted(max(0.0, started - scheduled) for started, scheduled in zip(self._started[:count], self._scheduled[:count]))
+        summary.update({
+            'last_started_at': self._started[last],
+            'last_duration_seconds': round(self._durations[last], 4),
+            'last_outcome': 'error' if self._failed[last] else 'ok',
+            'duration_seconds': {'p50': round(durations[count // 2], 4), 'p95': round(durations[int(count * 0.95)], 4),
+                                 'max': round(durations[-1], 4)},
+            'lag_seconds': {'p50': round(lags[count // 2], 4), 'max': round(lags[-1], 4)},
+        })
+        return summary
+
+class SchedulerHealth:
+    """Run buffers of every scheduled job, fed by the job wrapper and the scheduler's events."""
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def job(self, job_id):
+        runs = self._jobs.get(job_id)
+        if runs is None:
+            with self._lock:
+                runs = self._jobs.setdefault(job_id, JobRuns(self.capacity))
+        return runs
+
+    def record(self, job_id, scheduled_at, started_at, duration, failed):
+        runs = self.job(job_id)
+        with self._lock:
+            runs.record(scheduled_at, started_at, duration, failed)
+
+    def count_missed(self, job_id):
+        runs = self.job(job_id)
+        with self._lock:
+            runs.missed += 1
+
+    def count_skipped(self, job_id):
+        runs = self.job(job_id)
+        with self._lock:
+            runs.skipped += 1
+
+    def summary(self):
+        with self._lock:
+            return {job_id: runs.summary() for job_id, runs in self._jobs.items()}
@@ -1,26 +1,146 @@
 import os
+import sys
+import time
+import queue
+import atexit
+import threading
 from datetime import datetime
 
 class Logger:
-    def __init__(self, log_file_path):
+    """Log file writer that keeps disk I/O off the calling thread.
+
+    log() only formats the entry and puts it on a bounded queue. A writer thread
+    drains the queue in batches, optionally echoes them to the console and
+    rotates the file once it exceeds `max_bytes` or `max_age_hours`. When the
+    queue is full, because the log disk is slow or full, entries are dropped and
+    counted instead of blocking the caller.
+    """
+
+    _STOP = object()
+
+    def __init__(self, log_file_path, echo=True, max_bytes=10 * 1024 * 1024, max_age_hours=0,
+                 backup_count=5, queue_size=10000):
         self.log_file_path = log_file_path
-        
+        self.echo = echo
+        self.max_bytes = max_bytes or 0
+        self.max_age_seconds = (max_age_hours or 0) * 3600
+        self.backup_count = backup_count or 0
+        self.dropped = 0
+        # log() runs on many threads; only a full queue takes this lock
+        self._dropped_lock = threading.Lock()
+
         log_dir = os.path.dirname(log_file_path)
         if log_dir:
             os.makedirs(log_dir, exist_ok=True)
-        
-        try:
-            with open(self.log_file_path, 'a') as f:
-                pass
-        except Exception as e:
-            print(f"Error creating log file at {self.log_file_path}: {e}")
+
+        self._file = None
+        self._opened_at = time.time()
+        self._open()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._writer, name='logger', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
 
     def log(self, message, level="INFO"):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_entry = f"[{timestamp}] [{level}] {message}\n"
-        print(log_entry) 
         try:
-            with open(self.log_file_path, 'a') as f:
-                f.write(log_entry)
+            self._queue.put_nowait(log_entry)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _open(self):
+        try:
+            self._file = open(self.log_file_path, 'a')
+            self._opened_at = time.time()
         except Exception as e:
-            print(f"Error writing to log file: {e}")
+            self._file = None
+            print(f"Error creating log file at {self.log_file_path}: {e}")
+
+    def _should_rotate(self):
+        if self._file is None:
+            return False
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        return bool(self.max_age_seconds) and time.time() - self._opened_at >= self.max_age_seconds
+
+    def _rotate(self):
+        self._file.close()
+        try:
+            if self.backup_count:
+                for i in range(self.backup_count - 1, 0, -1):
+                    source = f"{self.log_file_path}.{i}"
+                    if os.path.exists(source):
+                        os.replace(source, f"{self.log_file_path}.{i + 1}")
+                os.replace(self.log_file_path, f"{self.log_file_path}.1")
+            else:
+                os.remove(self.log_file_path)
+        except OSError as e:
+            print(f"Error rotating log file {self.log_file_path}: {e}")
+        self._open()
+
+    def _writer(self):
+        while True:
+            entries = []
+            entry = self._queue.get()
+            # take everything that piled up while the last batch was written
+            while entry is not self._STOP:
+                entries.append(entry)
+                if len(entries) >= 1000:
+                    break
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            stop = entry is self._STOP
+
+            if entries:
+                batch = ''.join(entries)
+                if self.echo:
+                    sys.stdout.write(batch)
+                    sys.stdout.flush()
+                try:
+                    if self._file is None:
+                        self._open()
+                    if self._file is not None:
+                        self._file.write(batch)
+                        self._file.flush()
+                        if self._should_rotate():
+                            self._rotate()
+                except Exception as e:
+                    print(f"Error writing to log file: {e}")
+                    try:
+                        self._file.close()
+                    except Exception:
+                        pass
+                    self._file = None
+
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def close(self, timeout=5):
+        """Writes out every queued entry and stops the writer thread, waiting at most `timeout` seconds."""
+        if not self._thread.is_alive():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(self._STOP, timeout=timeout / 2)
+        except queue.Full:
+            # the writer is stuck on the log disk; give up the oldest entry so it stops after this queue
+            try:
+                self._queue.get_nowait()
+                with self._dropped_lock:
+                    self.dropped += 1
+                self._queue.put_nowait(self._STOP)
+            except (queue.Empty, queue.Full):
+                pass
+        self._thread.join(max(0, deadline - time.monotonic()))
@@ -0,0 +1,233 @@
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def _label_text(labelnames, labels):
+    if not labelnames:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)) + '}'
+
+class _Metric:
+    """One metric family in the Prometheus text format.
+
+    Writers update values and mark the family dirty; render() reuses the text of
+    the last scrape until something changed, so scrapes between two updates only
+    join cached strings.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._text = None
+
+    def _header(self):
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+
+    def _lines(self):
+        raise NotImplementedError
+
+    def render(self):
+        text = self._text
+        if text is None:
+            with self._lock:
+                text = self._text = self._header() + ''.join(self._lines())
+        return text
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        # a counter kept elsewhere is read on every scrape, like a gauge backed by a function
+        self._function = function
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+            self._text = None
+
+    def render(self):
+        if self._function is not None:
+            return self._header() + f"{self.name} {_format_value(self._function())}\n"
+        return super().render()
+
+    def _lines(self):
+        return [f"{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}\n"
+                for labels, value in self._values.items()]
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        # a gauge backed by a function is read on every scrape and must be cheap
+        self._function = function
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+            self._text = None
+
+    def replace(self, values):
+        """Swaps in a whole new {labels: value} dict, dropping series that are gone."""
+        with self._lock:
+            self._values = values
+            self._text = None
+
+    def render(self):
+        if self._function is not None:
+            return self._header() + f"{self.name} {_format_value(self._function())}\n"
+        return super().render()
+
+    def _lines(self):
+        return [f"{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}\n"
+                for labels, value in self._values.items() if value is not None]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # labels -> [count per bucket..., sum, count]
+        self._values = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+            self._text = None
+
+    def _lines(self):
+        lines = []
+        bucket_labelnames = self.labelnames + ('le',)
+        for labels, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(bucket_labelnames, labels + (_format_value(float(bound)),))} {cumulative}\n")
+            label_text = _label_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-2])}\n")
+            lines.append(f"{self.name}_count{label_text} {series[-1]}\n")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=(), function=None):
+        return self.register(Counter(name, documentation, labelnames, function))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, buckets, labelnames=()):
+        return self.register(Histogram(name, documentation, buckets, labelnames))
+
+    def render(self):
+        return ''.join(metric.render() for metric in self._metrics).encode('utf-8')
+
+registry = MetricsRegistry()
+
+# per volume, refreshed once per sample by update_volume_metrics()
+_VOLUME_GAUGES = (
+    (registry.gauge('disk_monitor_volume_up', "1 if the last sample of the volume succeeded.", ('path',)),
+     lambda stats: 1 if stats.get('disk_usage') else 0),
+    (registry.gauge('disk_monitor_volume_size_bytes', "Total size of the volume.", ('path',)),
+     lambda stats: (stats.get('disk_usage_bytes') or {}).get('total')),
+    (registry.gauge('disk_monitor_volume_used_bytes', "Used bytes on the volume.", ('path',)),
+     lambda stats: (stats.get('disk_usage_bytes') or {}).get('used')),
+    (registry.gauge('disk_monitor_volume_free_bytes', "Bytes available to unprivileged users.", ('path',)),
+     lambda stats: (stats.get('disk_usage_bytes') or {}).get('free')),
+    (registry.gauge('disk_monitor_volume_used_percent', "Used space in percent.", ('path',)),
+     lambda stats: (stats.get('disk_usage') or {}).get('percent')),
+    (registry.gauge('disk_monitor_volume_threshold_percent', "Configured usage threshold.", ('path',)),
+     lambda stats: stats.get('usage_threshold')),
+    (registry.gauge('disk_monitor_volume_inodes_used_percent', "Used inodes in percent.", ('path',)),
+     lambda stats: (stats.get('inodes') or {}).get('percent')),
+    (registry.gauge('disk_monitor_volume_inodes_free', "Inodes available to unprivileged users.", ('path',)),
+     lambda stats: (stats.get('inodes') or {}).get('free')),
+    (registry.gauge('disk_monitor_volume_fill_rate_bytes_per_hour', "Fitted fill rate of the volume.", ('path',)),
+     lambda stats: (stats.get('forecast') or {}).get('fill_rate_bytes_per_hour')),
+    (registry.gauge('disk_monitor_volume_hours_to_threshold', "Forecast hours until the threshold is reached.", ('path',)),
+     lambda stats: (stats.get('forecast') or {}).get('estimated_time_to_threshold')),
+    (registry.gauge('disk_monitor_volume_read_bytes_per_second', "Read throughput of the volume's device.", ('path',)),
+     lambda stats: (stats.get('io') or {}).get('read_bytes_per_second')),
+    (registry.gauge('disk_monitor_volume_write_bytes_per_second', "Write throughput of the volume's device.", ('path',)),
+     lambda stats: (stats.get('io') or {}).get('write_bytes_per_second')),
+    (registry.gauge('disk_monitor_volume_read_iops', "Read operations per second of the volume's device.", ('path',)),
+     lambda stats: (stats.get('io') or {}).get('read_iops')),
+    (registry.gauge('disk_monitor_volume_write_iops', "Write operations per second of the volume's device.", ('path',)),
+     lambda stats: (stats.get('io') or {}).get('write_iops')),
+    (registry.gauge('disk_monitor_volume_busy_percent', "Time the volume's device was busy in percent.", ('path',)),
+     lambda stats: (stats.get('io') or {}).get('busy_percent')),
+)
+_ALERT_LEVELS = {'OK': 0, 'RECOVERED': 0, 'WARNING': 1, 'CRITICAL': 2}
+volume_alert_level = registry.gauge(
+    'disk_monitor_volume_alert_level', "Alert state of the volume: 0 ok, 1 warning, 2 critical.", ('path', 'metric'))
+
+disk_stats_duration = registry.histogram(
+    'disk_monitor_disk_stats_duration_seconds', "Time taken to sample every monitored volume.",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+disk_stats_last_run = registry.gauge(
+    'disk_monitor_disk_stats_last_run_timestamp_seconds', "Unix time of the last completed sample.")
+job_runs = registry.counter(
+    'disk_monitor_job_runs_total', "Scheduled job runs by outcome (ok, error, missed, skipped).", ('job', 'outcome'))
+job_duration = registry.histogram(
+    'disk_monitor_job_duration_seconds', "Duration of scheduled job runs.",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60), ('job',))
+sampling_interval = registry.gauge(
+    'disk_monitor_sampling_interval_seconds', "Seconds until the next sample, as chosen by the adaptive interval.")
+scheduler_lag = registry.gauge(
+    'disk_monitor_scheduler_lag_seconds', "Delay between the scheduled and the actual start of the last job run.", ('job',))
+webpush_request_duration = registry.histogram(
+    'disk_monitor_webpush_request_duration_seconds', "Latency of single web-push requests.",
+    (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+webpush_fanout_duration = registry.histogram(
+    'disk_monitor_webpush_fanout_duration_seconds', "Time to deliver one notification to every subscription.",
+    (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+webpush_deliveries = registry.counter(
+    'disk_monitor_webpush_deliveries_total', "Web-push deliveries by outcome.", ('outcome',))
+fleet_poll_duration = registry.histogram(
+    'disk_monitor_fleet_poll_duration_seconds', "Time taken to poll every fleet node once.",
+    (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+fleet_nodes = registry.gauge(
+    'disk_monitor_fleet_nodes', "Fleet nodes by status (ok, stale, down).", ('status',))
+
+def update_volume_metrics(stats):
+    """Precomputes the per-volume gauges from one multi_disk_stats() result."""
+    for gauge, extract in _VOLUME_GAUGES:
+        gauge.replace({(path,): extract(volume_stats) for path, volume_stats in stats.items()})
+    levels = {}
+    for path, volume_stats in stats.items():
+        for metric, key in (('space', 'alert_state'), ('inodes', 'inode_alert_state')):
+            if key in volume_stats:
+                levels[(path, metric)] = _ALERT_LEVELS.get(volume_stats[key], 0)
+    volume_alert_level.replace(levels)
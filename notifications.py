@@ -1,65 +1,416 @@
 import os
 import json
-from pywebpush import webpush, WebPushException
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
 from config_manager import ConfigManager
 from logger import Logger
 from disk_scanner import disk_stats
+from subscription_store import SubscriptionStore
+from outbox import Outbox
+from vapid import VapidSigner
+from alerts import AlertTracker
+from usage_scanner import get_usage_scanner, summarize_usage
+from process_io import summarize_writers
+from metrics import webpush_request_duration, webpush_fanout_duration, webpush_deliveries
 import traceback
 
+_store = None
+_outbox = None
+_signer = None
+_alerts = AlertTracker()
+# volumes that already got a forecast warning, cleared once their forecast moves out of range again
+_forecast_warned = set()
+_store_lock = threading.Lock()
+# callers currently using each store; a replaced store is closed by the last of them
+_store_users = {}
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def _get_session(endpoint, pool_size):
+    """Returns the keep-alive session shared by every subscription of one push-service origin.
+
+    The connection pool is grown when a fan-out asks for more workers than it
+    was built for, so every worker can keep its connection.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    parts = urlsplit(endpoint)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    with _sessions_lock:
+        session, size = _sessions.get(origin, (None, 0))
+        if session is None:
+            session = requests.Session()
+        if pool_size > size:
+            previous = session.get_adapter('https://') if size else None
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            if previous is not None:
+                previous.close()
+            _sessions[origin] = (session, pool_size)
+    return session
+
+def _deliver(subscription_info, payload_str, signer, timeout, pool_size, logger):
+    started = time.perf_counter()
+    outcome = _push(subscription_info, payload_str, signer, timeout, pool_size, logger)
+    webpush_request_duration.observe(time.perf_counter() - started)
+    webpush_deliveries.inc(outcome)
+    return outcome
+
+def _push(subscription_info, payload_str, signer, timeout, pool_size, logger):
+    # pywebpush pulls in requests, aiohttp and cryptography; importing it on first use keeps startup fast
+    from pywebpush import webpush, WebPushException
+    try:
+        webpush(
+            subscription_info=subscription_info,
+            data=payload_str,
+            # signed once per push-service origin; without claims webpush does no signing of its own
+            headers=signer.headers(subscription_info['endpoint']),
+            timeout=timeout,
+            requests_session=_get_session(subscription_info['endpoint'], pool_size)
+        )
+        return 'delivered'
+    except WebPushException as e:
+        if e.response is not None and e.response.status_code in [404, 410]:
+            return 'expired'
+        if logger:
+            logger.log(f"Push to {urlsplit(subscription_info['endpoint']).netloc} failed: {e}", level="WARNING")
+        return 'failed'
+    except Exception as e:
+        if logger:
+            logger.log(f"Failed to deliver notification to {urlsplit(subscription_info['endpoint']).netloc}: {e}",
+                       level="ERROR")
+        return 'failed'
+
+def deliver_notifications(subscriptions, payload_str, signer, max_workers=16, timeout=10, logger=None):
+    """Sends one payload to every subscription on a bounded worker pool.
+
+    Returns a dict mapping each endpoint to 'delivered', 'expired' or 'failed'.
+    """
+    results = {}
+    if not subscriptions:
+        return results
+    started = time.perf_counter()
+    # the pools are sized for the configured workers, not this fan-out, so they are not stuck small after a short one
+    pool_size = max(1, max_workers)
+    with ThreadPoolExecutor(max_workers=min(pool_size, len(subscriptions)), thread_name_prefix='webpush') as executor:
+        futures = {
+            executor.submit(_deliver, subscription_info, payload_str, signer, timeout, pool_size, logger): subscription_info['endpoint']
+            for subscription_info in subscriptions
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    webpush_fanout_duration.observe(time.perf_counter() - started)
+    return results
+
+def get_vapid_signer(config_manager):
+    """Returns the VAPID signer, loading the private key again only when its file or the subject changed."""
+    global _signer
+    private_key_file = config_manager.get('NOTIFICATIONS', 'vapid_private_key')
+    subject = config_manager.get('NOTIFICATIONS', 'vapid_email')
+    mtime = os.path.getmtime(private_key_file)
+    with _store_lock:
+        if _signer is None or (_signer.private_key_file, _signer.subject, _signer.mtime) != (private_key_file, subject, mtime):
+            _signer = VapidSigner(private_key_file, subject)
+    return _signer
+
+@contextmanager
+def subscription_store(config_manager):
+    """Yields the subscription store for `subscription_db_file`, opening a new one when the setting changed.
+
+    The store stays open until the block ends, even when the setting changes
+    meanwhile; a replaced store is closed once its last user is done.
+    """
+    global _store
+    db_file = config_manager.get('NOTIFICATIONS', 'subscription_db_file')
+    retired = None
+    with _store_lock:
+        if _store is None or _store.db_file != db_file:
+            if _store is not None and not _store_users.get(_store):
+                retired = _store
+            legacy_json_file = config_manager.get('NOTIFICATIONS', 'subscription_file')
+            _store = SubscriptionStore(db_file, legacy_json_file)
+        store = _store
+        _store_users[store] = _store_users.get(store, 0) + 1
+    if retired is not None:
+        retired.close()
+    try:
+        yield store
+    finally:
+        with _store_lock:
+            _store_users[store] -= 1
+            unused = not _store_users[store]
+            if unused:
+                del _store_users[store]
+        if unused and store is not _store:
+            store.close()
+
+def count_subscriptions(config_manager):
+    with subscription_store(config_manager) as store:
+        return len(store)
+
 def send_notification(config_manager, logger, payload):
-    VAPID_PUBLIC_KEY = config_manager.get('NOTIFICATIONS', 'vapid_public_key')
-    VAPID_PRIVATE_KEY = config_manager.get('NOTIFICATIONS', 'vapid_private_key')
-    VAPID_CLAIMS = { "sub": config_manager.get('NOTIFICATIONS', 'vapid_email') }
-    subscription_file = config_manager.get('NOTIFICATIONS', 'subscription_file')
-    
-    if not os.path.exists(subscription_file) or os.path.getsize(subscription_file) == 0:
-        return
-    payload_str = json.dumps(payload)
-    
-    with open(subscription_file, 'r') as f:
-        subscriptions = json.load(f)
-
-    valid_subscriptions = []
-    for subscription_info in subscriptions:
-        try:
-            webpush(
-                subscription_info=subscription_info,
-                data=payload_str, 
-                vapid_private_key=VAPID_PRIVATE_KEY,
-                vapid_claims=VAPID_CLAIMS
-            )
-            valid_subscriptions.append(subscription_info)
-        except WebPushException as e:
-            if e.response and e.response.status_code in [404, 410]:
-                pass
+    signer = get_vapid_signer(config_manager)
+    max_workers = config_manager.get('NOTIFICATIONS', 'push_max_workers', int) or 1
+    timeout = config_manager.get('NOTIFICATIONS', 'push_timeout_seconds', float)
+
+    with subscription_store(config_manager) as store:
+        subscriptions = store.all()
+        if not subscriptions:
+            return {}
+        payload_str = json.dumps(payload)
+
+        results = deliver_notifications(subscriptions, payload_str, signer, max_workers, timeout, logger)
+        counts = {outcome: list(results.values()).count(outcome) for outcome in ('delivered', 'expired', 'failed')}
+        logger.log(f"Notification sent to {len(results)} subscriptions: {counts}", level="INFO")
+
+        store.apply_results(results)
+    return results
+
+def _deliver_queued(config_manager, logger, payload_str, endpoints):
+    # outbox delivery callback: resolves endpoints to their current subscription and records the outcome
+    signer = get_vapid_signer(config_manager)
+    max_workers = config_manager.get('NOTIFICATIONS', 'push_max_workers', int) or 1
+    timeout = config_manager.get('NOTIFICATIONS', 'push_timeout_seconds', float)
+
+    with subscription_store(config_manager) as store:
+        results = {}
+        subscriptions = []
+        for endpoint in endpoints:
+            subscription_info = store.get(endpoint)
+            if subscription_info is None:
+                # unsubscribed while the message was queued
+                results[endpoint] = 'expired'
             else:
-                print(f"WebPushException: {e}")
-                pass
-    
-    with open(subscription_file, 'w') as f:
-        json.dump(valid_subscriptions, f)
+                subscriptions.append(subscription_info)
+        results.update(deliver_notifications(subscriptions, payload_str, signer, max_workers, timeout, logger))
+        counts = {outcome: list(results.values()).count(outcome) for outcome in ('delivered', 'expired', 'failed')}
+        logger.log(f"Queued notification delivered to {len(results)} subscriptions: {counts}", level="INFO")
+        store.apply_results(results)
+    return results
+
+def get_outbox(config_manager, logger):
+    """Returns the notification outbox, starting its dispatcher on first use."""
+    global _outbox
+    with _store_lock:
+        if _outbox is None:
+            _outbox = Outbox(
+                config_manager.get('NOTIFICATIONS', 'outbox_db_file'),
+                lambda payload_str, endpoints: _deliver_queued(config_manager, logger, payload_str, endpoints),
+                config_manager.get('NOTIFICATIONS', 'retry_base_seconds', float),
+                config_manager.get('NOTIFICATIONS', 'retry_max_seconds', float),
+                (config_manager.get('NOTIFICATIONS', 'outbox_max_age_hours', float) or 0) * 3600,
+                logger=logger
+            )
+            _outbox.start()
+    return _outbox
+
+def close_outbox():
+    global _outbox
+    with _store_lock:
+        if _outbox is not None:
+            _outbox.close()
+            _outbox = None
+
+def enqueue_notification(config_manager, logger, payload):
+    """Queues a notification for every current subscription and returns without waiting for delivery."""
+    with subscription_store(config_manager) as store:
+        endpoints = store.endpoints()
+    message_id = get_outbox(config_manager, logger).enqueue(json.dumps(payload), endpoints)
+    logger.log(f"Notification queued for {len(endpoints)} subscriptions.", level="INFO")
+    return message_id
+
+
 
+_ALERT_TITLES = {
+    'warning': "PACS Disk Space Alert!",
+    'critical': "PACS Disk Space CRITICAL!",
+    'reminder': "PACS Disk Space Alert (ongoing)",
+    'recovered': "PACS Disk Space Recovered",
+}
 
+def _evaluate_alert(config_manager, key, percent, usage_threshold, critical_threshold):
+    return _alerts.evaluate(
+        key,
+        percent,
+        time.time(),
+        usage_threshold,
+        critical_threshold,
+        config_manager.get('DISK_MONITOR', 'hysteresis_percent', float) or 0,
+        (config_manager.get('NOTIFICATIONS', 'alert_cooldown_minutes', float) or 0) * 60,
+        (config_manager.get('NOTIFICATIONS', 'renotify_interval_minutes', float) or 0) * 60
+    )
+
+def _send_alert(config_manager, logger, message):
+    if config_manager.get('NOTIFICATIONS', 'enable_notifications', bool) == False:
+        return
+    try:
+        enqueue_notification(config_manager, logger, message)
+    except Exception as e:
+        logger.log("Failed to queue notification due to an exception.", level="ERROR")
+        traceback_str = traceback.format_exc()
+        logger.log(f"Full Traceback:\n{traceback_str}", level="ERROR")
 
 def check_disk_warning(config_manager, logger, data):
-    enable_notifications = config_manager.get('NOTIFICATIONS', 'enable_notifications', bool)
+    if not data.get('disk_usage'):
+        return
+    disk_path = data['disk_path']
+    percent = data['disk_usage']['percent']
+    state, event = _evaluate_alert(
+        config_manager,
+        disk_path,
+        percent,
+        data['usage_threshold'],
+        config_manager.get('DISK_MONITOR', 'critical_threshold', float)
+    )
+    data['alert_state'] = state
+    check_inode_warning(config_manager, logger, data)
+    if event is None:
+        return
 
-    if (data['disk_usage'] and data['disk_usage']['percent'] >= data['usage_threshold']):
-        message = {
-            "title": "PACS Disk Space Alert!",
-            "body": f"Disk usage on '{data['disk_path']}' is at {data['disk_usage']['percent']}%. Contact Integration Team."
-        }
-        logger.log(f"Disk usage WARNING: {message['body']}", level="WARNING")
-        if enable_notifications == False:
-            return
-        try:
-            print("Trying to send notification...")
-            send_notification(config_manager, logger, message)
-            print("Successfully sent notification.")
-        except Exception as e:
-            logger.log("Failed to send notification due to an exception.", level="ERROR")
-            traceback_str = traceback.format_exc()
-            logger.log(f"Full Traceback:\n{traceback_str}", level="ERROR")
+    usage_scanner = get_usage_scanner(config_manager)
+    if event == 'recovered':
+        body = f"Disk usage on '{disk_path}' is back to {percent}%, below the {data['usage_threshold']}% threshold."
+    else:
+        body = f"Disk usage on '{disk_path}' is at {percent}%. Contact Integration Team."
+        summary = summarize_usage(usage_scanner.latest(disk_path))
+        if summary:
+            body += f" {summary}"
+        writers = summarize_writers(data.get('top_writers'))
+        if writers:
+            body += f" {writers}"
+        if event in ('warning', 'critical'):
+            # refresh the breakdown so reminders and the dashboard show what filled the disk
+            usage_scanner.request_scan(disk_path, logger)
+    message = {
+        "title": _ALERT_TITLES[event],
+        "body": body
+    }
+    logger.log(f"Disk usage {state}: {message['body']}", level="INFO" if event == 'recovered' else "WARNING")
+    _send_alert(config_manager, logger, message)
+
+def check_inode_warning(config_manager, logger, data):
+    """Runs the inode usage of a volume through its own alert state when `inode_threshold` is set."""
+    inode_threshold = config_manager.get('DISK_MONITOR', 'inode_threshold', float)
+    inodes = data.get('inodes')
+    if not inode_threshold or not inodes:
+        return
+    disk_path = data['disk_path']
+    percent = inodes['percent']
+    critical_threshold = (config_manager.get('DISK_MONITOR', 'inode_critical_threshold', float)
+                          or config_manager.get('DISK_MONITOR', 'critical_threshold', float))
+    state, event = _evaluate_alert(
+        config_manager,
+        f"{disk_path} (inodes)",
+        percent,
+        inode_threshold,
+        # like critical_threshold, an empty or 0 value means no CRITICAL level
+        max(critical_threshold, inode_threshold) if critical_threshold else None
+    )
+    data['inode_alert_state'] = state
+    if event is None:
+        return
+
+    if event == 'recovered':
+        body = f"Inode usage on '{disk_path}' is back to {percent}%, below the {inode_threshold}% threshold."
+    else:
+        body = f"Inode usage on '{disk_path}' is at {percent}% ({inodes['free']} files left). Contact Integration Team."
+    message = {
+        "title": _ALERT_TITLES[event].replace("Disk Space", "Disk Inode"),
+        "body": body
+    }
+    logger.log(f"Inode usage {state}: {message['body']}", level="INFO" if event == 'recovered' else "WARNING")
+    _send_alert(config_manager, logger, message)
+
+
+# fleet nodes currently reported unreachable, cleared when they answer again
+_fleet_unreachable = set()
+_EVENT_ORDER = ('critical', 'warning', 'reminder', 'recovered')
+_FLEET_ALERT_LINES = 20
+_FLEET_LINE_NODES = 8
+
+def check_fleet_alerts(config_manager, logger, view):
+    """Evaluates every node's volumes and reachability, and queues one notification for the whole site.
+
+    Volumes are tracked per `node:path` with the usual state machine, but only
+    on fresh data, so a node that stopped answering neither raises nor clears
+    its alerts. Events on the same mount point are folded into one line, so a
+    share mounted on many nodes is reported once.
+    """
+    critical_threshold = config_manager.get('DISK_MONITOR', 'critical_threshold', float)
+    grouped = {}
+    unreachable = []
+    reachable = []
+    for name, node in view['nodes'].items():
+        if node['status'] == 'down':
+            if name not in _fleet_unreachable:
+                _fleet_unreachable.add(name)
+                unreachable.append(name)
+            continue
+        if name in _fleet_unreachable and node['status'] == 'ok':
+            _fleet_unreachable.discard(name)
+            reachable.append(name)
+        if node['status'] != 'ok':
+            continue
+        for disk_path, volume_stats in node['volumes'].items():
+            if not volume_stats.get('disk_usage'):
+                continue
+            percent = volume_stats['disk_usage']['percent']
+            state, event = _evaluate_alert(config_manager, f"{name}:{disk_path}", percent,
+                                           volume_stats['usage_threshold'], critical_threshold)
+            if event is not None:
+                grouped.setdefault((event, disk_path), []).append(f"{name} {percent}%")
+
+    lines = []
+    for (event, disk_path), nodes in sorted(grouped.items(), key=lambda item: (_EVENT_ORDER.index(item[0][0]), item[0][1])):
+        if len(nodes) > _FLEET_LINE_NODES:
+            nodes = nodes[:_FLEET_LINE_NODES] + [f"{len(nodes) - _FLEET_LINE_NODES} more nodes"]
+        lines.append(f"{event.upper()} '{disk_path}': {', '.join(nodes)}")
+    if unreachable:
+        lines.append(f"UNREACHABLE: {', '.join(unreachable)}")
+    if reachable:
+        lines.append(f"REACHABLE AGAIN: {', '.join(reachable)}")
+    if not lines:
+        return None
+    if len(lines) > _FLEET_ALERT_LINES:
+        lines = lines[:_FLEET_ALERT_LINES - 1] + [f"... and {len(lines) - _FLEET_ALERT_LINES + 1} more"]
+
+    events = {event for event, _ in grouped}
+    top = next((event for event in _EVENT_ORDER if event in events), 'warning' if unreachable else 'recovered')
+    message = {
+        "title": _ALERT_TITLES[top].replace("PACS", "PACS Fleet"),
+        "body": "\n".join(lines)
+    }
+    logger.log(f"Fleet alert: {' | '.join(lines)}", level="INFO" if top == 'recovered' else "WARNING")
+    _send_alert(config_manager, logger, message)
+    return message
+
+
+
+def check_disk_forecast(config_manager, logger, data):
+    """Warns once when a volume below its threshold is forecast to reach it within `forecast_warning_hours`."""
+    warning_hours = config_manager.get('DISK_MONITOR', 'forecast_warning_hours', float)
+    disk_path = data['disk_path']
+    forecast = data.get('forecast') or {}
+    hours = forecast.get('estimated_time_to_threshold')
+
+    if not hours or not warning_hours or hours > warning_hours:
+        _forecast_warned.discard(disk_path)
+        return
+    if disk_path in _forecast_warned:
+        return
+    _forecast_warned.add(disk_path)
+
+    message = {
+        "title": "PACS Disk Space Forecast",
+        "body": f"Disk '{disk_path}' will fill to {data['usage_threshold']}% in {hours:.1f} hours at the current rate "
+                f"(now {data['disk_usage']['percent']}%). Contact Integration Team."
+    }
+    logger.log(f"Disk usage FORECAST: {message['body']}", level="WARNING")
+    _send_alert(config_manager, logger, message)
 
 
 
@@ -68,36 +419,10 @@ def check_disk_warning(config_manager, logger, data):
 
 
 def save_subscription(config_manager, logger, subscription_info):
-    subscription_file = config_manager.get('NOTIFICATIONS', 'subscription_file')
-    subscriptions = []
-    if os.path.exists(subscription_file) and os.path.getsize(subscription_file) > 0:
-        with open(subscription_file, 'r') as f:
-            subscriptions = json.load(f)
-    if subscription_info not in subscriptions:
-        subscriptions.append(subscription_info)
-        with open(subscription_file, 'w') as f:
-            json.dump(subscriptions, f)
-        return True
-    return False
-
-    
+    with subscription_store(config_manager) as store:
+        return store.add(subscription_info)
+
+
 def unsubscribe(config_manager, logger, endpoint):
-    subscription_file = config_manager.get('NOTIFICATIONS', 'subscription_file')
-    if not os.path.exists(subscription_file):
-        return False
-    
-    with open(subscription_file, 'r') as f:
-        try:
-            subscriptions = json.load(f)
-        except json.JSONDecodeError:
-            subscriptions = []
-
-    original_count = len(subscriptions)
-    subscriptions = [sub for sub in subscriptions if sub.get('endpoint') != endpoint]
-
-    if len(subscriptions) < original_count:
-        with open(subscription_file, 'w') as f:
-            json.dump(subscriptions, f, indent=2)
-        return True
-    
-    return False
\ No newline at end of file
+    with subscription_store(config_manager) as store:
+        return store.remove(endpoint)
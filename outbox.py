@@ -0,0 +1,193 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+from subscription_store import _Transaction
+
+class Outbox:
+    """Durable notification queue with per-endpoint retry.
+
+    enqueue() writes the payload and one delivery row per recipient in a single
+    transaction and returns. A dispatcher thread hands due deliveries to
+    `deliver(payload_str, endpoints)`, which returns 'delivered', 'expired' or
+    'failed' per endpoint. Delivered and expired rows are removed; a failed
+    endpoint backs off exponentially with jitter, and all its pending
+    deliveries wait with it. Deliveries older than `max_age_seconds` are given
+    up on. Everything lives in SQLite, so queued alerts survive restarts.
+    """
+
+    def __init__(self, db_file, deliver, retry_base_seconds=5, retry_max_seconds=900,
+                 max_age_seconds=24 * 3600, batch_size=1000, logger=None):
+        self.db_file = db_file
+        self.deliver = deliver
+        self.retry_base_seconds = max(0.1, retry_base_seconds or 0)
+        self.retry_max_seconds = max(self.retry_base_seconds, retry_max_seconds or 0)
+        self.max_age_seconds = max_age_seconds
+        self.batch_size = batch_size
+        self.logger = logger
+        db_dir = os.path.dirname(db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS deliveries ("
+            " message_id INTEGER NOT NULL,"
+            " endpoint TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (message_id, endpoint))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS deliveries_endpoint ON deliveries(endpoint)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS endpoint_backoff ("
+            " endpoint TEXT PRIMARY KEY,"
+            " failures INTEGER NOT NULL,"
+            " next_attempt_at REAL NOT NULL)"
+        )
+        self._pending = self._conn.execute("SELECT COUNT(*) FROM deliveries").fetchone()[0]
+
+    @property
+    def pending(self):
+        """Deliveries waiting to be made or retried."""
+        return self._pending
+
+    def enqueue(self, payload_str, endpoints):
+        """Stores a payload for every endpoint and returns its message id, or None without recipients."""
+        endpoints = list(dict.fromkeys(endpoints))
+        if not endpoints:
+            return None
+        with self._lock:
+            with _Transaction(self._conn):
+                message_id = self._conn.execute(
+                    "INSERT INTO messages (payload, created_at) VALUES (?, ?)", (payload_str, time.time())).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO deliveries (message_id, endpoint) VALUES (?, ?)",
+                    [(message_id, endpoint) for endpoint in endpoints]
+                )
+            self._pending += len(endpoints)
+        self._wake.set()
+        return message_id
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='outbox', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout=10):
+        if self._running:
+            self._running = False
+            self._wake.set()
+            self._thread.join(timeout)
+        with self._lock:
+            self._conn.close()
+
+    def _run(self):
+        while self._running:
+            try:
+                wait = self.dispatch()
+            except Exception as e:
+                if self.logger:
+                    self.logger.log(f"Outbox dispatch failed: {e}", level="ERROR")
+                wait = self.retry_base_seconds
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def _backoff(self, failures):
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (failures - 1))
+        # equal jitter: endpoints that failed together do not all retry in the same second
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _due(self, now):
+        with self._lock:
+            if self.max_age_seconds:
+                with _Transaction(self._conn):
+                    given_up = self._conn.execute(
+                        "DELETE FROM deliveries WHERE message_id IN (SELECT id FROM messages WHERE created_at < ?)",
+                        (now - self.max_age_seconds,)).rowcount
+                    self._conn.execute("DELETE FROM messages WHERE id NOT IN (SELECT message_id FROM deliveries)")
+                    self._conn.execute("DELETE FROM endpoint_backoff WHERE next_attempt_at < ?",
+                                       (now - self.retry_max_seconds,))
+                self._pending -= given_up
+                if given_up and self.logger:
+                    self.logger.log(f"Outbox gave up on {given_up} deliveries older than "
+                                    f"{self.max_age_seconds / 3600:g} hours.", level="WARNING")
+            return self._conn.execute(
+                "SELECT d.message_id, m.payload, d.endpoint FROM deliveries d"
+                " JOIN messages m ON m.id = d.message_id"
+                " LEFT JOIN endpoint_backoff b ON b.endpoint = d.endpoint"
+                " WHERE b.next_attempt_at IS NULL OR b.next_attempt_at <= ?"
+                " ORDER BY d.message_id LIMIT ?", (now, self.batch_size)).fetchall()
+
+    def dispatch(self):
+        """Delivers everything that is due and returns the seconds until the next retry is due."""
+        now = time.time()
+        rows = self._due(now)
+        messages = {}
+        for message_id, payload_str, endpoint in rows:
+            messages.setdefault(message_id, (payload_str, []))[1].append(endpoint)
+
+        failed_this_round = set()
+        for message_id, (payload_str, endpoints) in messages.items():
+            # an endpoint that just failed waits for its backoff before the next message
+            endpoints = [endpoint for endpoint in endpoints if endpoint not in failed_this_round]
+            if not endpoints:
+                continue
+            results = self.deliver(payload_str, endpoints)
+            failed = [endpoint for endpoint in endpoints if results.get(endpoint, 'failed') == 'failed']
+            failed_this_round.update(failed)
+            self._record(message_id, endpoints, results, failed)
+
+        if len(rows) >= self.batch_size:
+            return 0
+        with self._lock:
+            next_due = self._conn.execute(
+                "SELECT MIN(b.next_attempt_at) FROM deliveries d JOIN endpoint_backoff b ON b.endpoint = d.endpoint"
+            ).fetchone()[0]
+        if next_due is None:
+            # nothing is backing off; sleep until the next enqueue unless rows arrived meanwhile
+            return None if not self._pending else self.retry_base_seconds
+        return max(0.0, next_due - time.time())
+
+    def _record(self, message_id, endpoints, results, failed):
+        now = time.time()
+        done = [(message_id, endpoint) for endpoint in endpoints if results.get(endpoint) == 'delivered']
+        expired = [(endpoint,) for endpoint in endpoints if results.get(endpoint) == 'expired']
+        with self._lock:
+            with _Transaction(self._conn):
+                removed = self._conn.executemany(
+                    "DELETE FROM deliveries WHERE message_id = ? AND endpoint = ?", done).rowcount
+                # a 404/410 endpoint is gone for good, so none of its queued messages can arrive
+                removed += self._conn.executemany("DELETE FROM deliveries WHERE endpoint = ?", expired).rowcount
+                self._conn.executemany("DELETE FROM endpoint_backoff WHERE endpoint = ?",
+                                       [(endpoint,) for _, endpoint in done] + expired)
+                self._conn.executemany(
+                    "UPDATE deliveries SET attempts = attempts + 1 WHERE message_id = ? AND endpoint = ?",
+                    [(message_id, endpoint) for endpoint in failed])
+                for endpoint in failed:
+                    row = self._conn.execute(
+                        "SELECT failures FROM endpoint_backoff WHERE endpoint = ?", (endpoint,)).fetchone()
+                    failures = (row[0] if row else 0) + 1
+                    self._conn.execute(
+                        "INSERT INTO endpoint_backoff (endpoint, failures, next_attempt_at) VALUES (?, ?, ?)"
+                        " ON CONFLICT(endpoint) DO UPDATE SET failures = excluded.failures,"
+                        " next_attempt_at = excluded.next_attempt_at",
+                        (endpoint, failures, now + self._backoff(failures)))
+                self._conn.execute(
+                    "DELETE FROM messages WHERE id = ? AND NOT EXISTS (SELECT 1 FROM deliveries WHERE message_id = ?)",
+                    (message_id, message_id))
+            self._pending -= removed
@@ -0,0 +1,88 @@
+import os
+import psutil
+from io_stats import device_for_path
+from usage_scanner import format_bytes
+
+# open file modes that can write
+_WRITE_MODES = ('w', 'a', 'r+', 'a+', 'w+')
+
+def _on_volume(path, disk_path, device, devices):
+    if device is not None:
+        return device_for_path(path, devices) == device
+    # network and pseudo filesystems have no block device, so fall back to the path
+    disk_path = os.path.realpath(disk_path)
+    return path == disk_path or path.startswith(disk_path.rstrip('/') + '/')
+
+class ProcessWriteTracker:
+    """Ranks processes by the bytes they wrote since the previous tick.
+
+    Every tick reads each process once, asking psutil for only its name,
+    start time and I/O counters, and updates one (start time, write_bytes,
+    tick) entry per pid in a table kept across ticks; a pid whose start time
+    changed was reused and starts over, and pids not seen this tick are
+    removed. Only the largest writers are then matched to volumes by the files
+    they hold open for writing, or by their working directory when they hold
+    none, so the costlier open file lookup runs for a handful of processes per
+    tick. Processes of other users need root to be visible.
+    """
+
+    def __init__(self, min_bytes=64 * 1024, candidates=20):
+        self.min_bytes = min_bytes
+        self.candidates = candidates
+        self._previous = {}
+        self._previous_time = None
+        self._tick = 0
+
+    def _writers(self, now):
+        self._tick += 1
+        tick = self._tick
+        previous = self._previous
+        writers = []
+        for process in psutil.process_iter(['name', 'create_time', 'io_counters']):
+            info = process.info
+            counters = info['io_counters']
+            if counters is None:
+                continue
+            entry = previous.get(process.pid)
+            if entry is not None and entry[0] == info['create_time'] and counters.write_bytes - entry[1] >= self.min_bytes:
+                writers.append((counters.write_bytes - entry[1], process))
+            previous[process.pid] = (info['create_time'], counters.write_bytes, tick)
+        for pid in [pid for pid, entry in previous.items() if entry[2] != tick]:
+            del previous[pid]
+        interval = now - self._previous_time if self._previous_time is not None else None
+        self._previous_time = now
+        writers.sort(key=lambda writer: writer[0], reverse=True)
+        return writers[:self.candidates], interval
+
+    def top_writers(self, volumes, devices, now, top_n=5):
+        """Returns {disk_path: [writer, ...]} for `volumes` mapping each disk path to its device name (or None)."""
+        writers, interval = self._writers(now)
+        results = {disk_path: [] for disk_path in volumes}
+        if not interval:
+            return results
+        for written, process in writers:
+            try:
+                paths = [f.path for f in process.open_files() if f.mode in _WRITE_MODES]
+                if not paths:
+                    # daemons mostly run in /, so the working directory only counts without open files
+                    paths.append(process.cwd())
+                paths = [os.path.realpath(path) for path in paths]
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, OSError):
+                continue
+            writer = {
+                'pid': process.pid,
+                'name': process.info['name'],
+                'written_bytes': written,
+                'write_bytes_per_second': round(written / interval),
+            }
+            for disk_path, device in volumes.items():
+                if len(results[disk_path]) < top_n and any(_on_volume(path, disk_path, device, devices) for path in paths):
+                    results[disk_path].append(writer)
+        return results
+
+def summarize_writers(writers, count=3):
+    """One line naming the processes writing most to a volume, for alert bodies."""
+    if not writers:
+        return None
+    return "Top writers: " + ", ".join(f"{writer['name']} (pid {writer['pid']}, {format_bytes(writer['write_bytes_per_second'])}/s)"
+                                       for writer in writers[:count])
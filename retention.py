@@ -0,0 +1,160 @@
+import os
+import time
+import heapq
+import threading
+import psutil
+from concurrent.futures import ThreadPoolExecutor
+from usage_scanner import _entry_bytes
+
+def _walk_unit(path, root_dev):
+    # total size, file count and newest mtime of one study folder
+    total_bytes = 0
+    files = 0
+    newest = 0.0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                        if entry.is_dir(follow_symlinks=False):
+                            if st.st_dev == root_dev:
+                                stack.append(entry.path)
+                            continue
+                        total_bytes += _entry_bytes(st)
+                        files += 1
+                        if st.st_mtime > newest:
+                            newest = st.st_mtime
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return total_bytes, files, newest
+
+def iter_units(root, unit_depth):
+    """Yields (path, bytes, files, newest mtime) for every deletable unit under root.
+
+    Directories `unit_depth` levels below root (study folders) are one unit each,
+    dated by their newest file. Files above that depth are units of their own.
+    With unit_depth 0 every file is a unit. Nothing is collected, units are
+    streamed as the walk reaches them.
+    """
+    root_dev = os.stat(root).st_dev
+    stack = [(root, 0)]
+    while stack:
+        current, depth = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                        if entry.is_dir(follow_symlinks=False):
+                            if st.st_dev != root_dev:
+                                continue
+                            if unit_depth and depth + 1 >= unit_depth:
+                                total_bytes, files, newest = _walk_unit(entry.path, root_dev)
+                                if files:
+                                    yield entry.path, total_bytes, files, newest
+                            else:
+                                stack.append((entry.path, depth + 1))
+                        else:
+                            yield entry.path, _entry_bytes(st), 1, st.st_mtime
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+def plan_retention(root, required_bytes, unit_depth=2):
+    """Returns the oldest units whose removal frees at least `required_bytes`, oldest first.
+
+    Candidates sit in a max-heap on age and the newest one is dropped whenever
+    the rest still cover the requirement, so memory grows with the size of the
+    plan, not with the number of files on the volume.
+    """
+    # entries are (-mtime, sequence, path, bytes, files) so the newest selected unit is on top
+    heap = []
+    selected_bytes = 0
+    scanned = 0
+    if required_bytes > 0:
+        for sequence, (path, size, files, mtime) in enumerate(iter_units(root, unit_depth)):
+            scanned += 1
+            if selected_bytes >= required_bytes and mtime >= -heap[0][0]:
+                continue
+            heapq.heappush(heap, (-mtime, sequence, path, size, files))
+            selected_bytes += size
+            while heap and selected_bytes - heap[0][3] >= required_bytes:
+                selected_bytes -= heapq.heappop(heap)[3]
+
+    items = sorted(heap, key=lambda item: (-item[0], item[1]))
+    return {
+        'items': [
+            {'path': path, 'bytes': size, 'files': files, 'newest_mtime': -negative_mtime}
+            for negative_mtime, _, path, size, files in items
+        ],
+        'planned_bytes': selected_bytes,
+        'scanned_units': scanned,
+        'sufficient': selected_bytes >= required_bytes,
+    }
+
+class RetentionPlanner:
+    """Builds retention plans in the background and keeps the latest plan per path."""
+
+    def __init__(self, unit_depth=2):
+        self.unit_depth = unit_depth
+        self._plans = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='retention')
+
+    def latest(self, root):
+        return self._plans.get(root)
+
+    def is_running(self, root):
+        return root in self._running
+
+    def request_plan(self, root, target_percent, logger=None):
+        """Starts planning `root` down to target_percent unless a plan is already running."""
+        with self._lock:
+            if root in self._running:
+                return False
+            self._running.add(root)
+        self._executor.submit(self._plan, root, target_percent, logger)
+        return True
+
+    def _plan(self, root, target_percent, logger):
+        started = time.time()
+        try:
+            usage = psutil.disk_usage(root)
+            target_bytes = int((usage.used + usage.free) * target_percent / 100)
+            required_bytes = max(0, usage.used - target_bytes)
+            plan = plan_retention(root, required_bytes, self.unit_depth)
+            plan.update(
+                root=root,
+                target_percent=target_percent,
+                required_bytes=required_bytes,
+                unit_depth=self.unit_depth,
+                planned_at=started,
+                duration_seconds=round(time.time() - started, 2)
+            )
+            self._plans[root] = plan
+            if logger:
+                logger.log(f"Retention plan for '{root}': {len(plan['items'])} items free {plan['planned_bytes']} bytes "
+                           f"of the {required_bytes} needed ({plan['duration_seconds']} s).", level="INFO")
+        except Exception as e:
+            if logger:
+                logger.log(f"Retention planning for '{root}' failed: {e}", level="ERROR")
+        finally:
+            with self._lock:
+                self._running.discard(root)
+
+_planner = None
+_planner_lock = threading.Lock()
+
+def get_retention_planner(config_manager):
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            _planner = RetentionPlanner(config_manager.get('DISK_MONITOR', 'retention_unit_depth', int))
+    return _planner
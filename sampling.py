@@ -0,0 +1,58 @@
+class AdaptiveInterval:
+    """Chooses the next sampling interval from headroom and fill rate.
+
+    For every volume, headroom is the distance in percentage points to the
+    nearest alert level (threshold, critical, 100%) above or below it, so a
+    volume just past a threshold is watched as closely as one just short of
+    it. Within `proximity_band` points of a level a volume is sampled every
+    base interval, scaled down in proportion to the headroom left. A growing
+    volume is also sampled at least `samples_to_level` times before it can
+    reach the next level above, using the faster of the windowed forecast and
+    the change since the previous sample, so a sudden burst shortens the
+    interval on the next tick. Further away only the fill rate counts, and a
+    volume that is not growing is idle. A volume whose sample failed holds the
+    interval at base until it recovers. The fastest volume wins and the result
+    is clamped to [minimum, maximum]; when every volume is idle that is the
+    maximum.
+    """
+
+    def __init__(self, proximity_band=10, samples_to_level=20):
+        self.proximity_band = proximity_band
+        self.samples_to_level = samples_to_level
+        # previous (timestamp, used bytes) of every path
+        self._previous = {}
+
+    def _percent_per_hour(self, disk_path, volume_stats, now):
+        usage_bytes = volume_stats['disk_usage_bytes']
+        rate = ((volume_stats.get('forecast') or {}).get('fill_rate_bytes_per_hour') or 0)
+        previous = self._previous.get(disk_path)
+        self._previous[disk_path] = (now, usage_bytes['used'])
+        if previous is not None and now > previous[0]:
+            rate = max(rate, (usage_bytes['used'] - previous[1]) / (now - previous[0]) * 3600)
+        return rate / usage_bytes['total'] * 100 if usage_bytes['total'] else 0
+
+    def next_interval(self, stats, now, base, minimum, maximum, critical_threshold):
+        """Returns (seconds, disk_path) where disk_path is the volume that set the pace, or None when idle."""
+        interval = maximum
+        pacing = None
+        for disk_path, volume_stats in stats.items():
+            if not volume_stats.get('disk_usage') or not volume_stats.get('disk_usage_bytes'):
+                # a failing mount is sampled every base interval until it answers again
+                if base < interval:
+                    interval = base
+                    pacing = disk_path
+                continue
+            percent = volume_stats['disk_usage']['percent']
+            percent_per_hour = self._percent_per_hour(disk_path, volume_stats, now)
+            levels = [level for level in (volume_stats['usage_threshold'], critical_threshold, 100) if level]
+            headroom = min(abs(level - percent) for level in levels)
+            if percent_per_hour <= 0 and headroom >= self.proximity_band:
+                continue
+            volume_interval = maximum if headroom >= self.proximity_band else base * headroom / self.proximity_band
+            above = [level for level in levels if level > percent]
+            if percent_per_hour > 0 and above:
+                volume_interval = min(volume_interval, (min(above) - percent) / percent_per_hour * 3600 / self.samples_to_level)
+            if volume_interval < interval:
+                interval = volume_interval
+                pacing = disk_path
+        return max(minimum, min(maximum, interval)), pacing
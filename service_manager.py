@@ -1,9 +1,22 @@
 from utils import get_base_path, get_resource_path
 import os
+import hashlib
 import subprocess
 import configparser
 
 
+def running_under_systemd():
+    # systemd sets INVOCATION_ID for every unit it starts
+    return bool(os.environ.get('INVOCATION_ID'))
+
+def _file_digest(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
 def install_service_from_config(config_manager, logger, main_executable_name="app"):
     config = config_manager.config
     service_name = config['SERVICE']['service_name']
@@ -14,8 +27,6 @@ def install_service_from_config(config_manager, logger, main_executable_name="ap
     service_group = config['SERVICE']['group']
     runtime_log_file = os.path.join(base_path, config['SERVICE']['runtime_log_file'])
 
-    logger.log(f"Installing service: {service_name}", level="INFO")
-
     log_dir = os.path.dirname(runtime_log_file)
     if not os.path.exists(log_dir):
         os.makedirs(log_dir, exist_ok=True)
@@ -38,6 +49,15 @@ StandardError=file:{runtime_log_file}
 [Install]
 WantedBy=multi-user.target
 """
+    if _file_digest(service_file_path) == hashlib.sha256(service_content.encode('utf-8')).hexdigest():
+        logger.log(f"Service file {service_file_path} is up to date, skipping installation.", level="INFO")
+        return
+    if running_under_systemd():
+        # stopping the unit from inside it would kill this very process
+        logger.log(f"Service file {service_file_path} is outdated; run the app once outside systemd to reinstall it.", level="WARNING")
+        return
+
+    logger.log(f"Installing service: {service_name}", level="INFO")
     try:
         logger.log(f"Stopping and disabling service: {service_name}", level="INFO")
         subprocess.run(['sudo', 'systemctl', 'stop', service_name], check=False, capture_output=True, text=True)
@@ -0,0 +1,37 @@
+import gzip
+import json
+import hashlib
+from flask import Response, request
+
+class SerializedSnapshot:
+    """A JSON payload serialized once, with its ETag and a lazily built gzip copy."""
+
+    def __init__(self, data):
+        self.body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self._gzipped = None
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+def snapshot_response(snapshot, min_gzip_size=1024):
+    """Serves a snapshot, answering 304 to a matching If-None-Match and gzip to clients that accept it.
+
+    The gzip body is a different representation, so it gets its own ETag.
+    """
+    gzipped = len(snapshot.body) >= min_gzip_size and request.accept_encodings['gzip'] > 0
+    etag = snapshot.etag + '-gzip' if gzipped else snapshot.etag
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif gzipped:
+        response = Response(snapshot.gzipped, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(snapshot.body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,280 @@
+import ssl
+import time
+import socket
+import selectors
+import threading
+from collections import deque
+
+STREAM_PATH = '/disk_stats/stream'
+
+_RESPONSE_HEADERS = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: text/event-stream\r\n"
+    b"Cache-Control: no-cache\r\n"
+    b"Connection: keep-alive\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"X-Accel-Buffering: no\r\n"
+    b"\r\n"
+    b"retry: 5000\n\n"
+)
+_PREFLIGHT_RESPONSE = (
+    b"HTTP/1.1 204 No Content\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Access-Control-Allow-Methods: GET\r\n"
+    b"Access-Control-Allow-Headers: Last-Event-ID, Cache-Control\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+)
+_NOT_FOUND_RESPONSE = b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+_HEARTBEAT = b": ping\n\n"
+
+class _Client:
+    def __init__(self, sock, address, handshaking):
+        self.sock = sock
+        self.address = address
+        self.state = 'handshake' if handshaking else 'request'
+        self.inbuf = b''
+        self.outbuf = bytearray()
+        self.close_when_sent = False
+
+class SseHub:
+    """Server-Sent Events broadcaster serving `/disk_stats/stream` on its own port.
+
+    Every client socket is owned by one selector loop thread, so an idle screen
+    costs a socket and a small buffer rather than a web server thread. publish()
+    may be called from any thread; the loop writes the event to every client and
+    drops clients whose unsent backlog grows past `max_buffer` bytes.
+    """
+
+    def __init__(self, host, port, ssl_context=None, heartbeat_seconds=15, max_clients=1000, max_buffer=256 * 1024):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_clients = max_clients
+        self.max_buffer = max_buffer
+
+        self._clients = {}
+        self._pending = deque()
+        self._latest = None
+        self._lock = threading.Lock()
+        self._selector = None
+        self._listener = None
+        self._waker = None
+        self._wake_sender = None
+        self._thread = None
+        self._running = False
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def start(self):
+        self._listener = socket.create_server((self.host, self.port), backlog=128)
+        self._listener.setblocking(False)
+        self.port = self._listener.getsockname()[1]
+        self._waker, self._wake_sender = socket.socketpair()
+        self._waker.setblocking(False)
+        self._wake_sender.setblocking(False)
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ, 'listener')
+        self._selector.register(self._waker, selectors.EVENT_READ, 'waker')
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='sse_hub', daemon=True)
+        self._thread.start()
+
+    def publish(self, body, event_id=None):
+        """Queues a JSON body (bytes without newlines) as the next event for every client."""
+        message = b''
+        if event_id:
+            message += b'id: ' + event_id.encode('utf-8') + b'\n'
+        message += b'data: ' + body + b'\n\n'
+        with self._lock:
+            self._latest = message
+            if not self._running:
+                # nobody is connected yet; new clients get the latest event on connect
+                return
+            self._pending.append(message)
+        self._wake()
+
+    def _wake(self):
+        if self._wake_sender is None:
+            return
+        try:
+            self._wake_sender.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self):
+        if not self._running:
+            return
+        self._running = False
+        self._wake()
+        self._thread.join(5)
+
+    def _run(self):
+        last_heartbeat = time.monotonic()
+        while self._running:
+            for key, mask in self._selector.select(timeout=self.heartbeat_seconds):
+                if key.data == 'listener':
+                    self._accept()
+                elif key.data == 'waker':
+                    self._drain_waker()
+                else:
+                    self._service(key.data, mask)
+
+            if time.monotonic() - last_heartbeat >= self.heartbeat_seconds:
+                last_heartbeat = time.monotonic()
+                self._broadcast(_HEARTBEAT)
+
+        for client in list(self._clients.values()):
+            self._drop(client)
+        self._selector.close()
+        self._listener.close()
+        self._waker.close()
+        self._wake_sender.close()
+        self._wake_sender = None
+
+    def _accept(self):
+        while True:
+            try:
+                sock, address = self._listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if len(self._clients) >= self.max_clients:
+                sock.close()
+                continue
+            sock.setblocking(False)
+            if self.ssl_context is not None:
+                sock = self.ssl_context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False)
+            client = _Client(sock, address, self.ssl_context is not None)
+            self._clients[sock.fileno()] = client
+            self._selector.register(sock, selectors.EVENT_READ, client)
+            if client.state == 'handshake':
+                self._handshake(client)
+
+    def _drain_waker(self):
+        try:
+            while self._waker.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        with self._lock:
+            messages = list(self._pending)
+            self._pending.clear()
+        for message in messages:
+            self._broadcast(message)
+
+    def _broadcast(self, message):
+        for client in list(self._clients.values()):
+            if client.state == 'stream':
+                client.outbuf += message
+                self._flush(client)
+
+    def _service(self, client, mask):
+        if client.state == 'handshake':
+            self._handshake(client)
+            return
+        if mask & selectors.EVENT_WRITE:
+            self._flush(client)
+        if mask & selectors.EVENT_READ and client.sock.fileno() in self._clients:
+            self._read(client)
+
+    def _handshake(self, client):
+        try:
+            client.sock.do_handshake()
+        except ssl.SSLWantReadError:
+            self._watch(client, selectors.EVENT_READ)
+            return
+        except ssl.SSLWantWriteError:
+            self._watch(client, selectors.EVENT_WRITE)
+            return
+        except (ssl.SSLError, OSError):
+            self._drop(client)
+            return
+        client.state = 'request'
+        self._watch(client, selectors.EVENT_READ)
+
+    def _read(self, client):
+        try:
+            data = client.sock.recv(4096)
+        except (BlockingIOError, InterruptedError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+            return
+        except (ssl.SSLError, OSError):
+            self._drop(client)
+            return
+        if not data:
+            self._drop(client)
+            return
+        if client.state != 'request':
+            return
+
+        client.inbuf += data
+        if b'\r\n\r\n' not in client.inbuf:
+            if len(client.inbuf) > 16 * 1024:
+                self._drop(client)
+            return
+        request_line = client.inbuf.split(b'\r\n', 1)[0].decode('latin-1').split()
+        client.inbuf = b''
+        method = request_line[0] if request_line else ''
+        path = request_line[1].split('?', 1)[0] if len(request_line) > 1 else ''
+
+        if path != STREAM_PATH:
+            client.outbuf += _NOT_FOUND_RESPONSE
+            client.close_when_sent = True
+        elif method == 'OPTIONS':
+            client.outbuf += _PREFLIGHT_RESPONSE
+            client.close_when_sent = True
+        else:
+            client.state = 'stream'
+            client.outbuf += _RESPONSE_HEADERS
+            with self._lock:
+                latest = self._latest
+            if latest:
+                client.outbuf += latest
+        self._flush(client)
+
+    def _flush(self, client):
+        while client.outbuf:
+            try:
+                sent = client.sock.send(client.outbuf)
+            except (BlockingIOError, InterruptedError, ssl.SSLWantWriteError, ssl.SSLWantReadError):
+                break
+            except (ssl.SSLError, OSError):
+                self._drop(client)
+                return
+            del client.outbuf[:sent]
+
+        if client.outbuf:
+            if len(client.outbuf) > self.max_buffer:
+                self._drop(client)
+                return
+            self._watch(client, selectors.EVENT_READ | selectors.EVENT_WRITE)
+        elif client.close_when_sent:
+            self._drop(client)
+        else:
+            self._watch(client, selectors.EVENT_READ)
+
+    def _watch(self, client, events):
+        try:
+            if self._selector.get_key(client.sock).events != events:
+                self._selector.modify(client.sock, events, client)
+        except (KeyError, ValueError):
+            pass
+
+    def _drop(self, client):
+        fileno = client.sock.fileno()
+        if fileno in self._clients:
+            del self._clients[fileno]
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            client.sock.close()
+        except OSError:
+            pass
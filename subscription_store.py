@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import bisect
+import hashlib
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+def device_id(endpoint):
+    """A short stable id for a subscription that does not reveal its endpoint."""
+    return hashlib.sha256(endpoint.encode('utf-8')).hexdigest()[:16]
+
+class SubscriptionStore:
+    """Push subscriptions keyed by endpoint.
+
+    Every subscription lives in an in-memory index for lookups and fan-out, and
+    in a SQLite database so each change is a single atomic row write instead of
+    a rewrite of the whole list. A list of (created_at, device id) kept sorted
+    next to the index serves cursor-paginated listings without sorting.
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_file, legacy_json_file=None):
+        self.db_file = db_file
+        db_dir = os.path.dirname(db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            " endpoint TEXT PRIMARY KEY,"
+            " info TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_delivered_at REAL,"
+            " failure_count INTEGER NOT NULL DEFAULT 0)"
+        )
+
+        self._index = {}
+        self._order = []
+        self._endpoints_by_id = {}
+        # bumped on every change, so the summary is only recounted after one
+        self._version = 0
+        self._summary = None
+        for endpoint, info, created_at, last_delivered_at, failure_count in self._conn.execute(
+                "SELECT endpoint, info, created_at, last_delivered_at, failure_count FROM subscriptions"
+                " ORDER BY created_at"):
+            self._index[endpoint] = {
+                'info': json.loads(info),
+                'created_at': created_at,
+                'last_delivered_at': last_delivered_at,
+                'failure_count': failure_count,
+            }
+            self._track(endpoint, created_at)
+
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < self.SCHEMA_VERSION:
+            if legacy_json_file:
+                self._import_legacy_json(legacy_json_file)
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _import_legacy_json(self, legacy_json_file):
+        if not os.path.exists(legacy_json_file) or os.path.getsize(legacy_json_file) == 0:
+            return
+        try:
+            with open(legacy_json_file, 'r') as f:
+                subscriptions = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not import subscriptions from '{legacy_json_file}': {e}")
+            return
+        for subscription_info in subscriptions:
+            if isinstance(subscription_info, dict) and subscription_info.get('endpoint'):
+                self.add(subscription_info)
+        print(f"Imported {len(subscriptions)} subscriptions from '{legacy_json_file}'.")
+
+    def _track(self, endpoint, created_at):
+        key = device_id(endpoint)
+        self._endpoints_by_id[key] = endpoint
+        bisect.insort(self._order, (created_at, key))
+
+    def _untrack(self, endpoint, created_at):
+        key = device_id(endpoint)
+        del self._endpoints_by_id[key]
+        del self._order[bisect.bisect_left(self._order, (created_at, key))]
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, endpoint):
+        return endpoint in self._index
+
+    def get(self, endpoint):
+        entry = self._index.get(endpoint)
+        return entry['info'] if entry else None
+
+    def endpoints(self):
+        return list(self._index)
+
+    def all(self):
+        return [entry['info'] for entry in list(self._index.values())]
+
+    def add(self, subscription_info):
+        """Stores a subscription, returns False if the same subscription is already stored."""
+        endpoint = subscription_info['endpoint']
+        with self._lock:
+            entry = self._index.get(endpoint)
+            if entry is not None and entry['info'] == subscription_info:
+                return False
+            info = json.dumps(subscription_info)
+            if entry is None:
+                created_at = time.time()
+                self._conn.execute(
+                    "INSERT INTO subscriptions (endpoint, info, created_at) VALUES (?, ?, ?)",
+                    (endpoint, info, created_at)
+                )
+                self._index[endpoint] = {
+                    'info': subscription_info,
+                    'created_at': created_at,
+                    'last_delivered_at': None,
+                    'failure_count': 0,
+                }
+                self._track(endpoint, created_at)
+            else:
+                # the browser renewed the keys of an endpoint it already registered
+                self._conn.execute("UPDATE subscriptions SET info = ? WHERE endpoint = ?", (info, endpoint))
+                entry['info'] = subscription_info
+            self._version += 1
+            return True
+
+    def remove(self, endpoint):
+        return self.remove_many([endpoint]) == 1
+
+    def remove_many(self, endpoints):
+        """Removes every given endpoint in one transaction and returns how many were stored."""
+        with self._lock:
+            endpoints = [endpoint for endpoint in set(endpoints) if endpoint in self._index]
+            if not endpoints:
+                return 0
+            with self._transaction():
+                self._conn.executemany("DELETE FROM subscriptions WHERE endpoint = ?", [(e,) for e in endpoints])
+            for endpoint in endpoints:
+                self._untrack(endpoint, self._index.pop(endpoint)['created_at'])
+            self._version += 1
+            return len(endpoints)
+
+    def apply_results(self, results):
+        """Records the outcome of a fan-out and drops expired subscriptions.
+
+        `results` maps endpoints to 'delivered', 'expired' or 'failed'.
+        """
+        expired = [endpoint for endpoint, outcome in results.items() if outcome == 'expired']
+        now = time.time()
+        with self._lock:
+            delivered = [(now, e) for e, outcome in results.items() if outcome == 'delivered' and e in self._index]
+            failed = [(e,) for e, outcome in results.items() if outcome == 'failed' and e in self._index]
+            with self._transaction():
+                self._conn.executemany(
+                    "UPDATE subscriptions SET last_delivered_at = ?, failure_count = 0 WHERE endpoint = ?", delivered)
+                self._conn.executemany(
+                    "UPDATE subscriptions SET failure_count = failure_count + 1 WHERE endpoint = ?", failed)
+            for _, endpoint in delivered:
+                self._index[endpoint]['last_delivered_at'] = now
+                self._index[endpoint]['failure_count'] = 0
+            for (endpoint,) in failed:
+                self._index[endpoint]['failure_count'] += 1
+            self._version += 1
+        return self.remove_many(expired)
+
+    def summary(self):
+        """Counts of all subscriptions: total, healthy, failing, never delivered and per push service."""
+        with self._lock:
+            if self._summary is not None and self._summary[0] == self._version:
+                return self._summary[1]
+            summary = {'total': len(self._index), 'healthy': 0, 'failing': 0, 'never_delivered': 0, 'push_services': {}}
+            for endpoint, entry in self._index.items():
+                summary['failing' if entry['failure_count'] else 'healthy'] += 1
+                if entry['last_delivered_at'] is None:
+                    summary['never_delivered'] += 1
+                origin = urlsplit(endpoint).netloc
+                summary['push_services'][origin] = summary['push_services'].get(origin, 0) + 1
+            self._summary = (self._version, summary)
+            return summary
+
+    def page(self, cursor=None, limit=50):
+        """Returns (devices, next_cursor) in subscription order, without keys or full endpoints.
+
+        `cursor` is the next_cursor of the previous page; next_cursor is None on the
+        last page. Raises ValueError for a cursor that was not handed out here.
+        """
+        start = 0
+        with self._lock:
+            if cursor:
+                created_at, _, key = cursor.rpartition('-')
+                start = bisect.bisect_right(self._order, (float(created_at), key))
+            keys = self._order[start:start + limit]
+            devices = []
+            for created_at, key in keys:
+                endpoint = self._endpoints_by_id[key]
+                entry = self._index[endpoint]
+                parts = urlsplit(endpoint)
+                devices.append({
+                    'id': key,
+                    'push_service': f"{parts.scheme}://{parts.netloc}",
+                    'created_at': created_at,
+                    'last_delivered_at': entry['last_delivered_at'],
+                    'failure_count': entry['failure_count'],
+                })
+            more = start + limit < len(self._order)
+        next_cursor = f"{keys[-1][0]!r}-{keys[-1][1]}" if keys and more else None
+        return devices, next_cursor
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class _Transaction:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN")
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,217 @@
+import os
+import time
+import sqlite3
+import threading
+from usage_scanner import _entry_bytes
+
+def _subtree_bounds(path):
+    # every path below `path` sorts between "path/" and "path0", since '0' follows '/'
+    prefix = path.rstrip('/') + '/'
+    return prefix, prefix[:-1] + '0'
+
+class UsageIndex:
+    """Persistent per-directory size index refreshed by mtime.
+
+    Every directory under an indexed root has a row with its own size and file
+    count, the totals of its subtree and the mtime its listing was read at. A
+    refresh only lists directories whose mtime changed; for the rest it stats the
+    known subdirectories from the index. Size changes are added to the totals of
+    every ancestor at the end, so the root total stays exact without a full walk.
+
+    A file that grows in place does not touch its directory mtime; set
+    `full_rescan_hours` to re-list everything now and then if that matters.
+    """
+
+    def __init__(self, db_file, full_rescan_hours=0):
+        self.db_file = db_file
+        self.full_rescan_seconds = (full_rescan_hours or 0) * 3600
+        db_dir = os.path.dirname(db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " root TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " parent TEXT,"
+            " depth INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " own_bytes INTEGER NOT NULL,"
+            " own_files INTEGER NOT NULL,"
+            " total_bytes INTEGER NOT NULL,"
+            " total_files INTEGER NOT NULL,"
+            " last_delta_bytes INTEGER NOT NULL DEFAULT 0,"
+            " changed_at REAL,"
+            " PRIMARY KEY (root, path))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(root, parent)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS dirs_root_size ON dirs(root, depth, total_bytes)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS roots (root TEXT PRIMARY KEY, full_scan_at REAL)")
+
+    def _children(self, root, path):
+        return [row[0] for row in self._conn.execute("SELECT path FROM dirs WHERE root = ? AND parent = ?", (root, path))]
+
+    def _list(self, path, root_dev):
+        own_bytes = 0
+        own_files = 0
+        errors = 0
+        subdirectories = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.stat(follow_symlinks=False).st_dev == root_dev:
+                            subdirectories.append(entry.path)
+                    else:
+                        own_bytes += _entry_bytes(entry.stat(follow_symlinks=False))
+                        own_files += 1
+                except OSError:
+                    errors += 1
+        return own_bytes, own_files, subdirectories, errors
+
+    def _remove_subtree(self, root, path, deltas):
+        row = self._conn.execute(
+            "SELECT parent, total_bytes, total_files FROM dirs WHERE root = ? AND path = ?", (root, path)).fetchone()
+        if row is None:
+            return
+        parent, total_bytes, total_files = row
+        low, high = _subtree_bounds(path)
+        self._conn.execute(
+            "DELETE FROM dirs WHERE root = ? AND (path = ? OR (path >= ? AND path < ?))", (root, path, low, high))
+        if parent is not None:
+            self._add_delta(deltas, parent, -total_bytes, -total_files)
+
+    @staticmethod
+    def _add_delta(deltas, path, delta_bytes, delta_files):
+        if delta_bytes or delta_files:
+            current = deltas.get(path)
+            if current is None:
+                deltas[path] = [delta_bytes, delta_files]
+            else:
+                current[0] += delta_bytes
+                current[1] += delta_files
+
+    def refresh(self, root):
+        """Brings the index of `root` up to date and returns refresh statistics."""
+        started = time.time()
+        root = os.path.abspath(root)
+        root_dev = os.stat(root).st_dev
+        stats = {'root': root, 'directories': 0, 'listed': 0, 'errors': 0}
+
+        with self._lock:
+            row = self._conn.execute("SELECT full_scan_at FROM roots WHERE root = ?", (root,)).fetchone()
+            full_scan = row is None or (self.full_rescan_seconds and started - (row[0] or 0) >= self.full_rescan_seconds)
+
+            # own size changes per directory, added to every ancestor at the end
+            deltas = {}
+            self._conn.execute("BEGIN")
+            try:
+                stack = [(root, None, 0)]
+                while stack:
+                    path, parent, depth = stack.pop()
+                    stats['directories'] += 1
+                    try:
+                        st = os.stat(path, follow_symlinks=False)
+                    except OSError:
+                        self._remove_subtree(root, path, deltas)
+                        continue
+
+                    indexed = self._conn.execute(
+                        "SELECT mtime_ns, own_bytes, own_files FROM dirs WHERE root = ? AND path = ?", (root, path)).fetchone()
+                    if indexed is not None and indexed[0] == st.st_mtime_ns and not full_scan:
+                        stack.extend((child, path, depth + 1) for child in self._children(root, path))
+                        continue
+
+                    try:
+                        own_bytes, own_files, subdirectories, errors = self._list(path, root_dev)
+                    except OSError:
+                        stats['errors'] += 1
+                        continue
+                    stats['listed'] += 1
+                    stats['errors'] += errors
+
+                    if indexed is None:
+                        self._conn.execute(
+                            "INSERT INTO dirs (path, parent, root, depth, mtime_ns, own_bytes, own_files, total_bytes, total_files)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0)",
+                            (path, parent, root, depth, st.st_mtime_ns, own_bytes, own_files)
+                        )
+                        self._add_delta(deltas, path, own_bytes, own_files)
+                    else:
+                        self._conn.execute(
+                            "UPDATE dirs SET mtime_ns = ?, own_bytes = ?, own_files = ? WHERE root = ? AND path = ?",
+                            (st.st_mtime_ns, own_bytes, own_files, root, path)
+                        )
+                        self._add_delta(deltas, path, own_bytes - indexed[1], own_files - indexed[2])
+
+                    current = set(subdirectories)
+                    for child in self._children(root, path):
+                        if child not in current:
+                            self._remove_subtree(root, child, deltas)
+                    stack.extend((child, path, depth + 1) for child in subdirectories)
+
+                self._apply_deltas(root, deltas, started)
+                self._conn.execute(
+                    "INSERT INTO roots (root, full_scan_at) VALUES (?, ?)"
+                    " ON CONFLICT(root) DO UPDATE SET full_scan_at = excluded.full_scan_at",
+                    (root, started if full_scan else (row[0] if row else started))
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        stats['duration_seconds'] = round(time.time() - started, 2)
+        return stats
+
+    def _apply_deltas(self, root, deltas, now):
+        totals = {}
+        for path, (delta_bytes, delta_files) in deltas.items():
+            while True:
+                self._add_delta(totals, path, delta_bytes, delta_files)
+                if path == root:
+                    break
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+        self._conn.executemany(
+            "UPDATE dirs SET total_bytes = total_bytes + ?, total_files = total_files + ?,"
+            " last_delta_bytes = ?, changed_at = ? WHERE root = ? AND path = ?",
+            [(delta_bytes, delta_files, delta_bytes, now, root, path) for path, (delta_bytes, delta_files) in totals.items()]
+        )
+
+    def usage(self, root, max_depth=3, top_n=20):
+        """Returns the root totals and the largest and fastest growing directories down to max_depth."""
+        root = os.path.abspath(root)
+        with self._lock:
+            root_row = self._conn.execute(
+                "SELECT total_bytes, total_files FROM dirs WHERE root = ? AND path = ?", (root, root)).fetchone()
+            if root_row is None:
+                return None
+            columns = "path, depth, total_bytes, total_files, last_delta_bytes, changed_at"
+            top = self._conn.execute(
+                f"SELECT {columns} FROM dirs WHERE root = ? AND depth BETWEEN 1 AND ?"
+                " ORDER BY total_bytes DESC LIMIT ?", (root, max_depth, top_n)).fetchall()
+            growing = self._conn.execute(
+                f"SELECT {columns} FROM dirs WHERE root = ? AND depth BETWEEN 1 AND ? AND last_delta_bytes > 0"
+                " ORDER BY changed_at DESC, last_delta_bytes DESC LIMIT ?", (root, max_depth, top_n)).fetchall()
+
+        def entry(row):
+            return {'path': row[0], 'depth': row[1], 'bytes': row[2], 'files': row[3],
+                    'last_delta_bytes': row[4], 'changed_at': row[5]}
+        return {
+            'root': root,
+            'total_bytes': root_row[0],
+            'file_count': root_row[1],
+            'top': [entry(row) for row in top],
+            'growing': [entry(row) for row in growing],
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
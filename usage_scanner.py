@@ -0,0 +1,194 @@
+import os
+import time
+import queue
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+def _entry_bytes(stat_result):
+    # allocated size like du reports it, falling back to the apparent size where blocks are unknown
+    blocks = getattr(stat_result, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else stat_result.st_size
+
+def _scan_directory(path, depth, max_depth, root_dev):
+    """Scans one directory and returns (path, depth, bytes, files, subdirectories, errors).
+
+    Directories above `max_depth` hand their subdirectories back to be scanned as
+    separate tasks; a directory at `max_depth` walks its whole subtree itself and
+    reports it as one total, so memory stays bounded by the directories down to
+    `max_depth` no matter how many files lie below.
+    """
+    total_bytes = 0
+    files = 0
+    errors = 0
+    subdirectories = []
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if root_dev is not None and entry.stat(follow_symlinks=False).st_dev != root_dev:
+                                continue
+                            if depth < max_depth:
+                                subdirectories.append(entry.path)
+                            else:
+                                stack.append(entry.path)
+                        else:
+                            total_bytes += _entry_bytes(entry.stat(follow_symlinks=False))
+                            files += 1
+                    except OSError:
+                        errors += 1
+        except OSError:
+            errors += 1
+    return path, depth, total_bytes, files, subdirectories, errors
+
+def scan_directory_usage(root, max_depth=3, top_n=20, max_workers=8, one_file_system=True):
+    """Sizes every directory under `root` down to `max_depth` levels on a thread pool.
+
+    Returns the total size and file count of `root` and the `top_n` largest
+    subtrees, each with its path, depth, size in bytes and file count.
+    """
+    started = time.time()
+    root = os.path.abspath(root)
+    root_dev = os.stat(root).st_dev if one_file_system else None
+
+    # path -> [depth, bytes, files] for the directories down to max_depth
+    totals = {}
+    errors = 0
+    finished = queue.SimpleQueue()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='usage_scan') as executor:
+        def submit(path, depth):
+            executor.submit(_scan_directory, path, depth, max_depth, root_dev).add_done_callback(finished.put)
+
+        submit(root, 0)
+        outstanding = 1
+        while outstanding:
+            path, depth, total_bytes, files, subdirectories, scan_errors = finished.get().result()
+            outstanding -= 1
+            totals[path] = [depth, total_bytes, files]
+            errors += scan_errors
+            for subdirectory in subdirectories:
+                submit(subdirectory, depth + 1)
+                outstanding += 1
+
+    # roll every directory up into its parent, deepest first
+    for path in sorted(totals, key=lambda p: totals[p][0], reverse=True):
+        if path != root:
+            parent = totals.get(os.path.dirname(path))
+            if parent is not None:
+                parent[1] += totals[path][1]
+                parent[2] += totals[path][2]
+
+    largest = heapq.nlargest(
+        top_n,
+        ((values[1], path) for path, values in totals.items() if path != root)
+    )
+    return {
+        'root': root,
+        'scanned_at': started,
+        'duration_seconds': round(time.time() - started, 2),
+        'total_bytes': totals[root][1],
+        'file_count': totals[root][2],
+        'errors': errors,
+        'top': [
+            {'path': path, 'depth': totals[path][0], 'bytes': size, 'files': totals[path][2]}
+            for size, path in largest
+        ],
+    }
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if size < 1024 or unit == 'TB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+
+def summarize_usage(result, count=3):
+    """One line naming the largest top-level directories of a scan, for alert bodies."""
+    if not result:
+        return None
+    entries = [entry for entry in result['top'] if entry['depth'] == 1][:count]
+    if not entries:
+        return None
+    return "Largest: " + ", ".join(f"{entry['path']} ({format_bytes(entry['bytes'])})" for entry in entries)
+
+class UsageScanner:
+    """Runs directory usage scans in the background, one at a time per root, and keeps the latest result."""
+
+    def __init__(self, max_depth=3, top_n=20, max_workers=8, index=None):
+        self.max_depth = max_depth
+        self.top_n = top_n
+        self.max_workers = max_workers
+        # a UsageIndex turns every scan after the first into an mtime-driven refresh
+        self.index = index
+        self._results = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='usage_scanner')
+
+    def latest(self, root):
+        return self._results.get(root)
+
+    def is_running(self, root):
+        return root in self._running
+
+    def request_scan(self, root, logger=None):
+        """Starts a scan of `root` unless one is already running, returns True if it started one."""
+        with self._lock:
+            if root in self._running:
+                return False
+            self._running.add(root)
+        self._executor.submit(self._scan, root, logger)
+        return True
+
+    def _scan(self, root, logger):
+        try:
+            if self.index is not None:
+                refresh = self.index.refresh(root)
+                result = self.index.usage(root, self.max_depth, self.top_n)
+                result.update(scanned_at=time.time() - refresh['duration_seconds'],
+                              duration_seconds=refresh['duration_seconds'],
+                              errors=refresh['errors'],
+                              listed_directories=refresh['listed'])
+            else:
+                result = scan_directory_usage(root, self.max_depth, self.top_n, self.max_workers)
+            self._results[root] = result
+            if logger:
+                logger.log(f"Directory usage scan of '{root}' finished in {result['duration_seconds']} s "
+                           f"({result['file_count']} files).", level="INFO")
+        except Exception as e:
+            if logger:
+                logger.log(f"Directory usage scan of '{root}' failed: {e}", level="ERROR")
+        finally:
+            with self._lock:
+                self._running.discard(root)
+
+_scanner = None
+_scanner_lock = threading.Lock()
+
+def get_usage_scanner(config_manager):
+    global _scanner
+    with _scanner_lock:
+        if _scanner is None:
+            index = None
+            if config_manager.get('DISK_MONITOR', 'use_usage_index', bool):
+                from usage_index import UsageIndex
+                index = UsageIndex(
+                    config_manager.get('DISK_MONITOR', 'usage_index_file'),
+                    config_manager.get('DISK_MONITOR', 'usage_full_rescan_hours', float)
+                )
+            _scanner = UsageScanner(
+                config_manager.get('DISK_MONITOR', 'usage_scan_depth', int),
+                config_manager.get('DISK_MONITOR', 'usage_top_n', int),
+                config_manager.get('DISK_MONITOR', 'usage_scan_workers', int),
+                index
+            )
+    return _scanner
+
+if __name__ == '__main__':
+    import sys
+    import json
+    result = scan_directory_usage(sys.argv[1] if len(sys.argv) > 1 else '.')
+    print(json.dumps(result, indent=2))
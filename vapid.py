@@ -0,0 +1,42 @@
+import os
+import time
+import threading
+from urllib.parse import urlsplit
+
+class VapidSigner:
+    """Signs VAPID headers once per push-service audience and reuses them.
+
+    The private key is parsed once. A signed token is valid for
+    `lifetime_seconds` and is handed out again for every endpoint of the same
+    origin until `refresh_seconds` before it expires, so a fan-out signs once
+    per push service instead of once per subscription.
+    """
+
+    def __init__(self, private_key_file, subject, lifetime_seconds=12 * 3600, refresh_seconds=600):
+        # py_vapid comes with pywebpush and loads cryptography, so it is imported when a signer is built
+        from py_vapid import Vapid
+        self.private_key_file = private_key_file
+        self.subject = subject
+        self.lifetime_seconds = lifetime_seconds
+        self.refresh_seconds = refresh_seconds
+        self.mtime = os.path.getmtime(private_key_file)
+        self._vapid = Vapid.from_file(private_key_file=private_key_file)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def headers(self, endpoint, now=None):
+        """Returns the Authorization (and Crypto-Key) headers for a subscription endpoint."""
+        parts = urlsplit(endpoint)
+        audience = f"{parts.scheme}://{parts.netloc}"
+        if now is None:
+            now = time.time()
+        cached = self._cache.get(audience)
+        if cached is not None and now < cached[1] - self.refresh_seconds:
+            return cached[0]
+        with self._lock:
+            cached = self._cache.get(audience)
+            if cached is None or now >= cached[1] - self.refresh_seconds:
+                expires = int(now) + self.lifetime_seconds
+                headers = self._vapid.sign({'sub': self.subject, 'aud': audience, 'exp': expires})
+                cached = self._cache[audience] = (headers, expires)
+        return cached[0]
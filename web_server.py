@@ -0,0 +1,64 @@
+import signal
+import threading
+
+def _install_signal_handlers(stop):
+    """Runs `stop` on a separate thread on the first SIGTERM or SIGINT and returns a function waiting for it.
+
+    Both servers wait for their serve loop to exit when stopping, so stop must
+    not run inside the signal handler, which interrupts that very loop.
+    """
+    stopper = threading.Thread(target=stop, name='server_stop', daemon=True)
+
+    def handle(signum, frame):
+        if stopper.ident is None:
+            stopper.start()
+
+    # systemd stops the service with SIGTERM; Ctrl+C sends SIGINT
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, handle)
+    return lambda: stopper.join() if stopper.ident is not None else None
+
+def serve(app, host, port, ssl_cert_path=None, ssl_key_path=None, threads=16, timeout=10,
+          request_queue_size=64, logger=None):
+    """Serves `app` with a multi-threaded production WSGI server until SIGTERM or SIGINT.
+
+    cheroot keeps HTTP/1.1 connections alive and handles requests on a fixed
+    pool of `threads`. Without cheroot installed it falls back to Werkzeug's
+    threaded server with the debugger off. Returns once the server stopped; in
+    flight requests get up to `timeout` seconds to finish.
+    """
+    try:
+        from cheroot import wsgi
+    except ImportError:
+        wsgi = None
+
+    if wsgi is None:
+        from werkzeug.serving import make_server
+        if logger:
+            logger.log("cheroot is not installed, serving with Werkzeug's threaded server.", level="WARNING")
+        ssl_context = (ssl_cert_path, ssl_key_path) if ssl_cert_path and ssl_key_path else None
+        server = make_server(host, port, app, threaded=True, ssl_context=ssl_context)
+        wait_for_stop = _install_signal_handlers(server.shutdown)
+        try:
+            server.serve_forever()
+        finally:
+            wait_for_stop()
+            server.server_close()
+        return
+
+    server = wsgi.Server((host, port), app, numthreads=threads, timeout=timeout,
+                         request_queue_size=request_queue_size, shutdown_timeout=timeout,
+                         server_name='disk_monitor')
+    if ssl_cert_path and ssl_key_path:
+        from cheroot.ssl.builtin import BuiltinSSLAdapter
+        server.ssl_adapter = BuiltinSSLAdapter(ssl_cert_path, ssl_key_path)
+    wait_for_stop = _install_signal_handlers(server.stop)
+    if logger:
+        logger.log(f"Serving on {host}:{port} with {threads} threads{' over TLS' if server.ssl_adapter else ''}.", level="INFO")
+    try:
+        server.prepare()
+        server.serve()
+    finally:
+        wait_for_stop()
+        server.stop()